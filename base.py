@@ -1,3 +1,4 @@
+import os
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -6,11 +7,125 @@ from pathlib import Path
 class Base:
 
     # JRAサイトデフォルトURL、ここから遷移ページパラメータを指定してpostを投げる
-    BASE_URL: str = "https://jra.jp/JRADB/accessO.html"
+    # (環境変数KEIBA_BASE_URLで上書き可、replay_server.py等のローカルサーバーに向ける場合)
+    BASE_URL: str = os.environ.get(
+        "KEIBA_BASE_URL", "https://jra.jp/JRADB/accessO.html"
+    )
     SCHEDULE_PAGE_PARAM: str = "pw01dli00/F3"
     ODDS_PAGE_PARAM: str = "pw15oli00/6D"
     RESULT_PAGE_PARAM: str = "pw01sli00/AF"
 
-    # 取得オッズ保管dir親パス
-    BASE_PATH: Path = Path.home() / "keiba-saiko/output/jra/"
+    # 過去のレース結果一覧(年月選択)ページ、backfill.pyの起点
+    RESULT_ARCHIVE_PARAM: str = "pw01skl00999999/B3"
+
+    # 取得オッズ保管dir親パス(環境変数KEIBA_BASE_PATHで上書き可)
+    BASE_PATH: Path = Path(
+        os.environ.get("KEIBA_BASE_PATH", Path.home() / "keiba-saiko/output/jra/")
+    )
     ARCHIVE_PATH: Path = Path.home() / "keiba-saiko/archive"
+
+    # backfill.pyの出力dir(作業キューのチェックポイント、レース結果csv)
+    BACKFILL_PATH: Path = Path.home() / "keiba-saiko/backfill"
+
+    # アーカイブ先S3バケット名
+    ARCHIVE_BUCKET: str = ""
+
+    # S3アップロード設定(同時アップロード数、圧縮形式: ""/"gzip"/"zstd"、ローカルS3等のエンドポイントURL)
+    ARCHIVE_MAX_WORKERS: int = 8
+    ARCHIVE_COMPRESSION: str = ""
+    ARCHIVE_ENDPOINT_URL: str = ""
+    # マルチパートアップロードを行うファイルサイズの閾値と分割サイズ(bytes)
+    ARCHIVE_MULTIPART_THRESHOLD: int = 8 * 1024 * 1024
+    ARCHIVE_MULTIPART_CHUNKSIZE: int = 8 * 1024 * 1024
+
+    # 開催中に各レースのオッズファイルを発走時刻のn分後にアップロードするか
+    STREAM_ARCHIVE: bool = False
+    STREAM_ARCHIVE_DELAY: int = 5
+
+    # 同時刻に実行するオッズ取得ジョブの最大同時実行数
+    ODDS_MAX_WORKERS: int = 12
+
+    # 予定時刻からこの秒数以上遅れたtickは実行せずスキップ
+    TICK_MAX_LAG: float = 60.0
+
+    # 再起動時、取得できなかったtickがあるレースのうち即時に1回だけ取り直す最大レース数(発走が近い順、0の場合は取り直さない)
+    # 完了したtickは開催日dirのticks.jsonlに記録し、再起動後は未完了かつ未来のtickのみ予約
+    RESUME_MAX_GAP_FILLS: int = 12
+
+    # 開催情報、出馬表、レース結果ページ取得の最大同時実行数(1の場合は逐次実行)
+    CRAWL_MAX_WORKERS: int = 8
+
+    # レース結果取得に失敗したレースの再試行回数
+    RESULT_RETRIES: int = 2
+
+    # backfill.pyの最大同時実行数と、同一ホストへの最小間隔秒(過去ページを大量に取得するため通常より長く)
+    BACKFILL_MAX_WORKERS: int = 4
+    BACKFILL_REQUEST_INTERVAL: float = 1.0
+    # 過去のレース結果ページ種別ごとのcnameの先頭文字列(月別開催一覧、開催ごとのレース一覧、レース結果)
+    BACKFILL_MONTH_PREFIX: str = "pw01skl10"
+    BACKFILL_KAISAI_PREFIX: str = "pw01srl"
+    BACKFILL_RESULT_PREFIX: str = "pw01sde"
+
+    # supervisor.pyの状態確認間隔(秒)と、workerプロセスの最大再起動回数
+    SUPERVISOR_INTERVAL: float = 30.0
+    MAX_WORKER_RESTARTS: int = 5
+
+    # JRAサイトへのリクエスト設定(タイムアウト秒、リトライ回数、バックオフ係数、同一ホストへの最小間隔秒)
+    REQUEST_TIMEOUT: float = 10.0
+    REQUEST_RETRIES: int = 3
+    REQUEST_BACKOFF: float = 0.5
+    REQUEST_INTERVAL: float = 0.05
+
+    # 指定した場合、JRAサイトのレスポンスをcnameごとにこのdirへ保存(replay_server.pyで再生)
+    RECORD_PATH: str = os.environ.get("KEIBA_RECORD_PATH", "")
+
+    # JRAサイトのレスポンスキャッシュ保存dir(""の場合はキャッシュしない)と、キャッシュの上限サイズ(bytes)
+    RESPONSE_CACHE_PATH: str = os.environ.get(
+        "KEIBA_RESPONSE_CACHE_PATH", str(Path.home() / "keiba-saiko/cache/jra")
+    )
+    RESPONSE_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    # ページ種別(cnameの先頭文字列)ごとのキャッシュ有効秒数、最長一致、該当なし/0はキャッシュしない
+    # (pw01dli/pw01drl: 開催一覧、pw01dde: 出馬表、pw01sde: レース結果、pw15: オッズ)
+    RESPONSE_CACHE_TTLS: tuple = (
+        ("pw01dli", 600),
+        ("pw01drl", 600),
+        ("pw01dde", 24 * 60 * 60),
+        ("pw01sde", 7 * 24 * 60 * 60),
+        ("pw15", 0),
+    )
+
+    # BeautifulSoupのパーサー(lxml未インストールの場合はhtml.parserを使用)
+    HTML_PARSER: str = "lxml"
+
+    # オッズ取得のスケジュール方式(fixed: 8時間前から5分間隔、adaptive: 発走直前ほど密に取得)
+    SCHEDULE_POLICY: str = "adaptive"
+
+    # オッズ格納形式(csv: race_{num}.csv、parquet: race_{num}_{seq}.parquet)と、
+    # parquet書き出し間隔(スナップショット数)
+    ODDS_STORAGE: str = "csv"
+    ODDS_FLUSH_SNAPSHOTS: int = 12
+
+    # csv書き込みのフラッシュ条件(バッファ行数、前回フラッシュからの秒数)と、フラッシュ時にfsyncするか
+    CSV_FLUSH_ROWS: int = 500
+    CSV_FLUSH_INTERVAL: float = 60.0
+    CSV_FSYNC: bool = True
+
+    # 単勝以外に取得する券種(place: 複勝、quinella: 馬連、exacta: 馬単、trifecta: 3連単、bet_odds.py参照)
+    # 券種ごとにrace_{num}_{券種}.binへ前回から変化したオッズのみ追記
+    # 複勝は単勝オッズページから取得するため追加リクエストなし、その他の券種はtickごとに1レース1ページ追加
+    # 各券種ページのセレクタは実ページで未検証のため、既定では取得しない(例: ("place",))
+    ODDS_BET_TYPES: tuple = ()
+    # 券種ごとの最小取得間隔(秒)、該当なしは毎tick取得
+    ODDS_BET_INTERVALS: tuple = (
+        ("quinella", 300),
+        ("exacta", 300),
+        ("trifecta", 600),
+    )
+
+    # 取得中のオッズをメモリから返すローカルAPIのポート(0の場合は起動しない)
+    ODDS_API_PORT: int = 0
+
+    # 処理時間メトリクスの出力先(Prometheus形式テキストのポート、定期出力するjsonファイルパスと間隔秒、0/""の場合は出力しない)
+    METRICS_PORT: int = 0
+    METRICS_JSON_PATH: str = ""
+    METRICS_JSON_INTERVAL: float = 60.0
@@ -0,0 +1,298 @@
+import csv
+import signal
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from keiba.base import Base
+from keiba.utils.cache_utils import response_cache_stats
+from keiba.utils.checkpoint_utils import CheckpointQueue
+from keiba.utils.date_utils import nengappi_to_yyyymmdd
+from keiba.utils.http_utils import get_session
+from keiba.utils.keiba_utils import get_jra_soup_object, get_page_param
+
+from post_process import RaceResults
+
+
+class Backfill(Base):
+    """Backfill race results of date range from JRA result archive.
+
+    Crawl:
+        archive top page(RESULT_ARCHIVE_PARAM)
+            -> month pages in range
+        month page(BACKFILL_MONTH_PREFIX)
+            -> other month pages in range, and kaisai pages of the month
+        kaisai page(BACKFILL_KAISAI_PREFIX)
+            -> result page of each race
+        result page(BACKFILL_RESULT_PREFIX)
+            -> place of each horse
+
+    Pages are crawled through CheckpointQueue(queue.jsonl),
+    so stopped or crashed backfill resumes where it left,
+    and each page is loaded once.
+    Requests are limited by BACKFILL_MAX_WORKERS and BACKFILL_REQUEST_INTERVAL.
+
+    file structure:
+        BACKFILL_PATH/{start_yyyymmdd}_{end_yyyymmdd}/queue.jsonl
+        BACKFILL_PATH/{start_yyyymmdd}_{end_yyyymmdd}/results.csv
+            header: date, kaisai, race, place, horse, param
+            1 row per horse of all races in range.
+            param is result page param, rows of a param are written once.
+            result pages without race date are skipped.
+
+    Parameters
+    ----------
+    start_yyyymmdd, end_yyyymmdd: str
+        Date range to backfill.(inclusive)
+
+    out_path: Path
+        Output dir. If None, dir of the range in BACKFILL_PATH.
+    """
+
+    def __init__(
+        self, start_yyyymmdd: str, end_yyyymmdd: str, out_path: Path = None
+    ) -> None:
+        super().__init__()
+        self.start_yyyymmdd = start_yyyymmdd
+        self.end_yyyymmdd = end_yyyymmdd
+        if out_path is None:
+            out_path = self.BACKFILL_PATH / f"{start_yyyymmdd}_{end_yyyymmdd}"
+        else:
+            pass
+
+        self.out_path = out_path
+        self.results_path = self.out_path / "results.csv"
+        self.header = ["date", "kaisai", "race", "place", "horse", "param"]
+
+        self.queue = CheckpointQueue(self.out_path / "queue.jsonl")
+        self.written_params = self._read_written_params()
+        # key: param, value: failed count
+        self.failures = {}
+
+        return None
+
+    def _read_written_params(self) -> set:
+        """Result params already in results.csv.
+        Rows of a task done but not checkpointed(crash) are not written twice.
+        """
+        if not self.results_path.exists():
+            return set()
+        else:
+            pass
+
+        with self.results_path.open(mode="r", newline="") as f:
+            return {row["param"] for row in csv.DictReader(f)}
+
+    def execute(self) -> None:
+        get_session().min_interval = max(
+            get_session().min_interval, self.BACKFILL_REQUEST_INTERVAL
+        )
+        self.queue.put("month", self.RESULT_ARCHIVE_PARAM)
+
+        new_file = not self.results_path.exists()
+        with self.results_path.open(mode="a", newline="") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(self.header)
+            else:
+                pass
+
+            try:
+                self._crawl(writer, f)
+            finally:
+                self.queue.close()
+
+        print(f"======Backfill finished: {self.queue.stats}======")
+
+        return None
+
+    def _crawl(self, writer, f) -> None:
+        """Run tasks in bounded thread pool until queue is empty.
+        Each task's rows are written and flushed before it's checkpointed as done.
+        """
+        with ThreadPoolExecutor(max_workers=self.BACKFILL_MAX_WORKERS) as executor:
+            running = {}
+            # progress is printed every 100 tasks done
+            reported = self.queue.stats["done"] // 100
+
+            while True:
+                while len(running) < self.BACKFILL_MAX_WORKERS:
+                    task = self.queue.get()
+                    if task is None:
+                        break
+                    else:
+                        running[executor.submit(self.run_task, task)] = task
+
+                if not running:
+                    break
+                else:
+                    pass
+
+                done_futures, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done_futures:
+                    task = running.pop(future)
+
+                    try:
+                        new_tasks, rows = future.result()
+                    except Exception as exc:
+                        self._fail(task, exc)
+                        continue
+
+                    if rows and (task["param"] not in self.written_params):
+                        writer.writerows(rows)
+                        f.flush()
+                        self.written_params.add(task["param"])
+                    else:
+                        pass
+
+                    for kind, param, context in new_tasks:
+                        self.queue.put(kind, param, context)
+
+                    self.queue.done(task["param"])
+
+                stats = self.queue.stats
+                if stats["done"] // 100 > reported:
+                    reported = stats["done"] // 100
+                    print(f"backfill {stats}")
+                else:
+                    pass
+
+        return None
+
+    def _fail(self, task: dict, exc: Exception) -> None:
+        """Retry failed task up to RESULT_RETRIES times in this run.
+        If still failing, it's left pending in checkpoint(retried on next run).
+        """
+        failed = self.failures.get(task["param"], 0) + 1
+        self.failures[task["param"]] = failed
+        print(f"{task['kind']} {task['param']} failed({failed}): {exc!r}")
+
+        if failed <= self.RESULT_RETRIES:
+            self.queue.retry(task)
+        else:
+            pass
+
+        return None
+
+    def run_task(self, task: dict) -> tuple:
+        """Load task's page, and parse it by its kind.
+
+        Returns
+        -------
+        tuple
+            new_tasks: list of (kind, param, context)
+            rows: list of results.csv rows
+        """
+        soup = get_jra_soup_object(self.BASE_URL, task["param"])
+
+        if task["kind"] == "month":
+            return (self._month_tasks(soup, task["param"]), [])
+        elif task["kind"] == "kaisai":
+            return (self._result_tasks(soup, task["context"]), [])
+        elif task["kind"] == "result":
+            return ([], self._result_rows(soup, task["param"], task["context"]))
+        else:
+            raise ValueError(f"unknown task kind: {task['kind']}")
+
+    @staticmethod
+    def _page_params(soup: BeautifulSoup) -> list:
+        """(param, a_tag) of all links in page."""
+        params = []
+        for a_tag in soup.find_all("a", onclick=True):
+            try:
+                params.append((get_page_param(a_tag), a_tag))
+            except IndexError:
+                continue
+
+        return params
+
+    def _month_tasks(self, soup: BeautifulSoup, param: str) -> list:
+        """Month pages in range, and kaisai pages linked from month page.
+        Month param has yyyymm after BACKFILL_MONTH_PREFIX.
+        (ex. pw01skl10202301/xx)
+        Kaisai pages are taken from month pages only, which are queued in range.
+        Archive top page shows current month, which may be out of range.
+        """
+        start_month = self.start_yyyymmdd[:6]
+        end_month = self.end_yyyymmdd[:6]
+        prefix_len = len(self.BACKFILL_MONTH_PREFIX)
+        is_month_page = param.startswith(self.BACKFILL_MONTH_PREFIX)
+
+        new_tasks = []
+        for link_param, a_tag in self._page_params(soup):
+            if link_param.startswith(self.BACKFILL_MONTH_PREFIX):
+                yyyymm = link_param[prefix_len:prefix_len + 6]
+                if start_month <= yyyymm <= end_month:
+                    new_tasks.append(("month", link_param, {}))
+                else:
+                    pass
+            elif is_month_page and link_param.startswith(self.BACKFILL_KAISAI_PREFIX):
+                context = {"kaisai": a_tag.text.strip()}
+                new_tasks.append(("kaisai", link_param, context))
+            else:
+                pass
+
+        return new_tasks
+
+    def _result_tasks(self, soup: BeautifulSoup, context: dict) -> list:
+        """Result pages of each race linked from kaisai page."""
+        new_tasks = []
+
+        race_list = soup.find(id="race_list")
+        for tr in race_list.find("tbody").find_all("tr") if race_list else []:
+            race_num = tr.find(class_="race_num").find("img").get("alt")
+            race_num = str(race_num.strip("レース"))
+
+            for param, _ in self._page_params(tr):
+                if param.startswith(self.BACKFILL_RESULT_PREFIX):
+                    new_tasks.append(("result", param, {**context, "race": race_num}))
+                    break
+                else:
+                    pass
+
+        return new_tasks
+
+    def _result_rows(self, soup: BeautifulSoup, param: str, context: dict) -> list:
+        """results.csv rows of result page.
+        Empty if race date is out of range or not found.
+        """
+
+        # ex) yyyy年mm月dd日（～曜） n回阪神n日
+        date_tag = soup.find(class_="date")
+        if date_tag is None:
+            print(f"result {param}: race date not found, skipped")
+            return []
+        else:
+            pass
+
+        nengappi = date_tag.text.strip().split(" ")[0].split("（")[0]
+        yyyymmdd = nengappi_to_yyyymmdd(nengappi)
+
+        if not (self.start_yyyymmdd <= yyyymmdd <= self.end_yyyymmdd):
+            return []
+        else:
+            pass
+
+        place_dict = RaceResults._parse_place_dict(soup)
+
+        kaisai = context.get("kaisai", "")
+        race_num = context.get("race", "")
+
+        return [
+            (yyyymmdd, kaisai, race_num, place_, horse, param)
+            for horse, place_ in place_dict.items()
+        ]
+
+
+if __name__ == "__main__":
+    # usage: python backfill.py start_yyyymmdd end_yyyymmdd
+    # on SIGTERM, exit through finally so checkpoint is closed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+
+    backfill = Backfill(sys.argv[1], sys.argv[2])
+    backfill.execute()
+
+    print(f"request stats: {get_session().stats}")
+    print(f"response cache stats: {response_cache_stats()}")
@@ -0,0 +1,251 @@
+import re
+from abc import ABC, abstractmethod
+from datetime import datetime
+
+from keiba.base import Base
+from keiba.utils.keiba_utils import get_jra_content, slice_table_html
+from keiba.utils.metrics_utils import metrics
+from keiba.utils.odds_utils import ComboOdds
+from keiba.utils.storage_utils import ComboOddsWriter
+
+TAG_RE = re.compile(r"<[^>]*>")
+NUM_RE = re.compile(r"\d+")
+TR_RE = re.compile(r"<tr[^>]*>(.*?)</tr>", re.S)
+CAPTION_TABLE_RE = re.compile(r"<caption[^>]*>(.*?)</caption>(.*?)</table>", re.S)
+ROW_RE = re.compile(r"<th[^>]*>(.*?)</th>\s*<td[^>]*>(.*?)</td>", re.S)
+
+
+def _text(html: str) -> str:
+    return TAG_RE.sub("", html).strip()
+
+
+class BetType(ABC):
+    """Odds page of 1 bet type, and how to parse it into ComboOdds.
+    To add bet type, subclass this and register it into BET_TYPES.
+
+    Large tables(ex. trifecta has up to 4896 combinations) are parsed
+    by regular expressions over decoded html, not by building soup tree.
+
+    Attributes
+    ----------
+    name: str
+        Bet type name, used in file name(race_{num}_{name}.bin)
+        and day manifest field(odds_{name}).
+
+    cname_prefix: str
+        cname prefix of its odds page.
+        win_page is True for bet types parsed from win odds page.
+
+    horses, ordered, width:
+        ComboOdds layout.
+    """
+
+    name = ""
+    cname_prefix = ""
+    win_page = False
+    horses = 1
+    ordered = True
+    width = 1
+
+    @classmethod
+    def empty(cls) -> ComboOdds:
+        return ComboOdds(cls.horses, cls.ordered, cls.width)
+
+    @classmethod
+    @abstractmethod
+    def parse(cls, content: bytes) -> ComboOdds:
+        """Parse odds page content into ComboOdds."""
+
+
+class PlaceBet(BetType):
+    """Place(複勝) odds, odds_fuku column of win odds page(odds_list table).
+    Values are (low, high) of odds range.
+    """
+
+    name = "place"
+    cname_prefix = "pw151"
+    win_page = True
+    width = 2
+
+    CELL_RE = re.compile(
+        r'<td[^>]*class="[^"]*\b(num|odds_fuku)\b[^"]*"[^>]*>(.*?)</td>', re.S
+    )
+
+    @classmethod
+    def parse(cls, content: bytes) -> ComboOdds:
+        odds = cls.empty()
+
+        odds_html = slice_table_html(content, "odds_list")
+        if odds_html is None:
+            return odds
+        else:
+            pass
+
+        for tr in TR_RE.findall(odds_html):
+            cells = dict(cls.CELL_RE.findall(tr))
+            horse_num = NUM_RE.findall(_text(cells.get("num", "")))
+            if not horse_num:
+                continue
+            else:
+                pass
+
+            # ex) 1.2-1.5
+            range_ = _text(cells.get("odds_fuku", "")).split("-")
+            if len(range_) == 2:
+                odds.set((int(horse_num[0]),), range_[0], range_[1])
+            else:
+                pass
+
+        return odds
+
+
+class CaptionTableBet(BetType):
+    """Combination odds page made of tables,
+    each table's caption is horse number(s) of former positions,
+    and each row is (last horse number, odds).
+
+    ex) trifecta, caption '1-2', row '3 | 123.4' -> (1, 2, 3): 123.4
+    """
+
+    @classmethod
+    def parse(cls, content: bytes) -> ComboOdds:
+        odds = cls.empty()
+        html = content.decode("shift-jis", errors="replace")
+
+        for caption, table in CAPTION_TABLE_RE.findall(html):
+            former = tuple(int(num) for num in NUM_RE.findall(_text(caption)))
+            if len(former) != cls.horses - 1:
+                continue
+            else:
+                pass
+
+            for last, value in ROW_RE.findall(table):
+                last = NUM_RE.findall(_text(last))
+                if last:
+                    odds.set(former + (int(last[0]),), _text(value))
+                else:
+                    pass
+
+        return odds
+
+
+class QuinellaBet(CaptionTableBet):
+    """Quinella(馬連) odds."""
+
+    name = "quinella"
+    cname_prefix = "pw154"
+    horses = 2
+    ordered = False
+
+
+class ExactaBet(CaptionTableBet):
+    """Exacta(馬単) odds."""
+
+    name = "exacta"
+    cname_prefix = "pw156"
+    horses = 2
+
+
+class TrifectaBet(CaptionTableBet):
+    """Trifecta(3連単) odds."""
+
+    name = "trifecta"
+    cname_prefix = "pw158"
+    horses = 3
+
+
+BET_TYPES = {
+    bet_type.name: bet_type
+    for bet_type in (PlaceBet, QuinellaBet, ExactaBet, TrifectaBet)
+}
+
+
+class BetOdds(Base):
+    """
+    Odds of 1 bet type in 1 race, collected in KaisaiOdds.job.
+    Each snapshot is parsed into ComboOdds(dense array),
+    and cells changed from last snapshot are appended
+    into race_{num}_{bet_type}.bin.
+
+    Parameters
+    ----------
+    kaisai_date, kaisai_name, race_num: str
+        Same as Odds.
+
+    bet_type: type
+        BetType subclass.
+
+    param: str
+        jra page parameter to jump its odds page.
+        None for bet types parsed from win odds page(content is given by KaisaiOdds).
+
+    min_interval: float
+        Seconds, odds are collected at most once in this interval.
+        (see Base.ODDS_BET_INTERVALS)
+    """
+
+    def __init__(
+        self,
+        kaisai_date: str,
+        kaisai_name: str,
+        race_num: str,
+        bet_type: type,
+        param: str = None,
+        min_interval: float = 0.0,
+    ) -> None:
+        super().__init__()
+        self.kaisai_name = kaisai_name
+        self.race_num = race_num
+        self.bet_type = bet_type
+        self.param = param
+        self.min_interval = min_interval
+        # time of last snapshot written
+        self.last_time = None
+        self.dir_path = self.BASE_PATH / f"{kaisai_date}/{kaisai_name}"
+        self.writer = ComboOddsWriter(
+            self.dir_path,
+            race_num,
+            bet_type.name,
+            bet_type.empty().size,
+            self.CSV_FSYNC,
+        )
+        # labels of metrics spans
+        self.labels = {"kaisai": kaisai_name, "race": race_num, "bet": bet_type.name}
+
+        return None
+
+    def is_due(self, now_: datetime) -> bool:
+        """True if min_interval passed since last snapshot."""
+        if self.last_time is None:
+            return True
+        else:
+            return (now_ - self.last_time).total_seconds() >= self.min_interval
+
+    def _fetch_content(self) -> bytes:
+        with metrics.span("bet_fetch", **self.labels):
+            content = get_jra_content(self.BASE_URL, self.param)
+
+        return content
+
+    def write(self, content: bytes, now_: datetime) -> None:
+        """Parse odds page content, and append changed odds."""
+        with metrics.span("bet_extract", **self.labels):
+            odds = self.bet_type.parse(content)
+
+        if all(value != value for value in odds.values):
+            # page layout changed or odds not on sale, not written as all NaN
+            raise ValueError(f"no {self.bet_type.name} odds in page")
+        else:
+            pass
+
+        with metrics.span("bet_write", **self.labels):
+            self.writer.write(odds.values, now_)
+
+        self.last_time = now_
+
+        return None
+
+    def flush(self) -> None:
+        self.writer.flush()
+
+        return None
@@ -1,17 +1,26 @@
-import sched
+import signal
 import sys
 import time
+from datetime import datetime
+from typing import Callable
 
 from keiba.base import Base
+from keiba.utils.checkpoint_utils import TickCheckpoint
 from keiba.utils.date_utils import (
     is_jst_timezone,
     set_jst_timezone,
     yyyymmdd_to_jra_date,
 )
-from keiba.utils.file_utils import read_json
+from keiba.utils.http_utils import get_session
+from keiba.utils.manifest_utils import DayManifest
+from keiba.utils.metrics_utils import MetricsExporter, metrics
+from keiba.utils.odds_utils import DayOddsStore
 
-from odds import Odds
+from odds import KaisaiOdds
+from odds_api import OddsApi, OddsApiServer
 from scheduling import Scheduling
+from stream_archive import StreamArchive
+from tick_scheduler import TickScheduler
 
 
 def check_timezone() -> None:
@@ -24,22 +33,212 @@ def check_timezone() -> None:
     return None
 
 
-if __name__ == "__main__":
+def collect_odds(
+    kaisai_date: str,
+    kaisai_names: list = None,
+    on_fire: Callable = None,
+    archiver: StreamArchive = None,
+    api_port: int = 0,
+    clock: Callable = time.time,
+    sleep: Callable = time.sleep,
+    metrics_port: int = Base.METRICS_PORT,
+    metrics_json_path: str = Base.METRICS_JSON_PATH,
+) -> TickScheduler:
+    """Schedule and run odds getting jobs of kaisai_date until all ticks are fired.
 
-    check_timezone()
+    Completed ticks of each race are checkpointed into
+    BASE_PATH/kaisai_date/ticks.jsonl once their rows are flushed by writer
+    (CSV_FLUSH_ROWS/CSV_FLUSH_INTERVAL for csv, ODDS_FLUSH_SNAPSHOTS for parquet),
+    so writes are still batched, and ticks buffered at hard kill are missed.
+    Restarted collector(ex. by supervisor) schedules only ticks
+    in the future and not completed yet.
+    Races which missed ticks while down are collected once right away,
+    up to Base.RESUME_MAX_GAP_FILLS races nearest to race time.
+
+    Parameters
+    ----------
+    kaisai_date: str
+        jra_format date. Ex: '1月23日（土曜）'
+
+    kaisai_names: list
+        Target kaisai names. If None, all kaisai of kaisai_date.
+
+    on_fire: Callable
+        Passed to TickScheduler, called after each tick.
+
+    archiver: StreamArchive
+        If given, each race's odds files are uploaded soon after race time.
+
+    api_port: int
+        If not 0, odds are also kept in memory,
+        and served by live odds api(OddsApiServer) on this port.
+
+    clock, sleep: Callable
+        Passed to TickScheduler. (ex. SimClock to simulate a race day)
+
+    metrics_port, metrics_json_path:
+        Where hot path metrics are exported. see MetricsExporter.
+
+    Returns
+    -------
+    TickScheduler
+        finished scheduler, to see its stats.
+    """
+    checkpoint = TickCheckpoint(Base.BASE_PATH / kaisai_date / "ticks.jsonl")
+    kaisai_odds = []
+    # (Odds, write_count, kaisai_name, race_num, planned) of ticks written
+    # but maybe buffered by writer
+    unflushed = []
+
+    def checkpoint_flushed() -> None:
+        """Checkpoint ticks whose rows are flushed by writer."""
+        flushed = {}
+        buffered = []
+        for tick in unflushed:
+            race, write_count, kaisai_name, race_num, planned = tick
+            if race.flushed_count < write_count:
+                buffered.append(tick)
+            else:
+                flushed.setdefault((kaisai_name, planned), []).append(race_num)
+
+        unflushed[:] = buffered
+        for (kaisai_name, planned), race_nums in flushed.items():
+            checkpoint.done(kaisai_name, race_nums, planned)
+
+        return None
+
+    def on_job_done(planned: float, job: Callable, race_nums: list, written) -> None:
+        for k in kaisai_odds:
+            if job == k.job:
+                # races failed in the job are not completed, they are gap filled
+                # on restart
+                for race_num in written:
+                    race = k.races[race_num]
+                    unflushed.append(
+                        (race, race.write_count, k.kaisai_name, race_num, planned)
+                    )
+                break
+            else:
+                pass
+
+        checkpoint_flushed()
+
+        return None
+
+    # all races due at the same time are collected in 1 tick,
+    # kaisai by kaisai concurrently
+    s = TickScheduler(
+        Base.ODDS_MAX_WORKERS,
+        Base.TICK_MAX_LAG,
+        clock=clock,
+        sleep=sleep,
+        on_fire=on_fire,
+        on_job_done=on_job_done,
+    )
+
+    exporter = MetricsExporter(
+        metrics, metrics_port, metrics_json_path, Base.METRICS_JSON_INTERVAL
+    )
+    exporter.start()
+
+    if api_port:
+        day_store = DayOddsStore()
+        api_server = OddsApiServer(OddsApi(day_store), api_port)
+        api_server.start()
+    else:
+        day_store = None
+        api_server = None
+
+    # ticks of races already started are all skipped by TickScheduler,
+    # so only races starting after now(- TICK_MAX_LAG) are scheduled
+    manifest = DayManifest.load(Base.BASE_PATH / kaisai_date)
+    now_ = clock()
+    since_ = datetime.fromtimestamp(now_ - Base.TICK_MAX_LAG)
+
+    kaisai_times = {}
+    for race_time, kaisai_name, race_num in manifest.races_after(
+        since_.strftime("%Y%m%d%H%M")
+    ):
+        if (kaisai_names is not None) and (kaisai_name not in kaisai_names):
+            continue
+        else:
+            pass
 
-    s = sched.scheduler(time.time, time.sleep)
+        kaisai_times.setdefault(kaisai_name, {})[race_num] = race_time
 
-    kaisai_date = yyyymmdd_to_jra_date(sys.argv[1])
-    kaisai_path = Base.BASE_PATH / kaisai_date
+    # (race_time, KaisaiOdds, race_num) of races with missed ticks
+    gap_races = []
 
-    for kaisai_name_path in kaisai_path.iterdir():
-        kaisai_name = kaisai_name_path.name
+    for kaisai_name, race_times in kaisai_times.items():
+        bet_params = {
+            bet_name: manifest.params(kaisai_name, f"odds_{bet_name}")
+            for bet_name in Base.ODDS_BET_TYPES
+        }
+        k = KaisaiOdds(
+            kaisai_date,
+            kaisai_name,
+            manifest.params(kaisai_name, "odds"),
+            day_store,
+            bet_params,
+        )
+        kaisai_odds.append(k)
 
-        race_times = read_json(kaisai_name_path / "times.json")
         for race_num, race_time in race_times.items():
-            o = Odds(kaisai_date, kaisai_name, race_num)
-            a = Scheduling(race_time, s, o.job)
-            a.setup_scheduler()
+            a = Scheduling(race_time, s, k.job)
+            missed = a.setup_tick_scheduler(
+                race_num, now_, checkpoint.ticks(kaisai_name, race_num)
+            )
+            if missed:
+                gap_races.append((race_time, k, race_num))
+            else:
+                pass
+
+        if archiver is not None:
+            archiver.setup_tick_scheduler(s, k, race_times)
+        else:
+            pass
+
+    # missed ticks can't be collected afterwards, so the current odds is taken once
+    gap_races.sort(key=lambda race: race[0])
+    for _, k, race_num in gap_races[:Base.RESUME_MAX_GAP_FILLS]:
+        s.add_job(datetime.fromtimestamp(now_), k.job, race_num)
+
+    try:
+        s.run()
+    finally:
+        for k in kaisai_odds:
+            k.flush()
+
+        checkpoint_flushed()
+        checkpoint.close()
+
+        if archiver is not None:
+            archiver.close()
+        else:
+            pass
+
+        if api_server is not None:
+            api_server.stop()
+        else:
+            pass
+
+        exporter.stop()
+
+    return s
+
+
+if __name__ == "__main__":
+
+    check_timezone()
+
+    # on SIGTERM, exit through finally so buffered odds are flushed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+
+    yyyymmdd = sys.argv[1]
+    kaisai_date = yyyymmdd_to_jra_date(yyyymmdd)
+    archiver = StreamArchive(yyyymmdd) if Base.STREAM_ARCHIVE else None
+
+    s = collect_odds(kaisai_date, archiver=archiver, api_port=Base.ODDS_API_PORT)
 
-    s.run()
+    print(f"tick stats: {s.stats}")
+    print(f"request stats: {get_session().stats}")
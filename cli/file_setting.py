@@ -1,12 +1,15 @@
-from itertools import starmap
 from pathlib import Path
 from typing import NamedTuple
 
 from bs4 import BeautifulSoup as bs
 from keiba.base import Base
+from keiba.utils.cache_utils import response_cache_stats
+from keiba.utils.concurrent_utils import concurrent_starmap
 from keiba.utils.date_utils import jihun_to_hhmm, nengappi_to_yyyymmdd
-from keiba.utils.file_utils import create_folders, dict_to_json, generate_csv, read_json
+from keiba.utils.file_utils import create_folders, generate_csv
+from keiba.utils.http_utils import get_session
 from keiba.utils.keiba_utils import get_jra_soup_object, get_page_param
+from keiba.utils.manifest_utils import MANIFEST_FILE, DayManifest
 
 
 class KaisaiParam(NamedTuple):
@@ -26,20 +29,15 @@ class Settings(Base):
 
     Create file structure:
         Make ouput folders to store files(race start time, odds).
-        And touch race_params.json to jump each race_card page in JRA site.
+        And collect params to jump each race_card page in JRA site.
 
         file structure:
             output(BASE_PATH)/kaisai_date/kaisai_name/
 
-        race_params.json:
-            key: race number
-            value: page parameter(to jump each race_card page)
-
 
     Generate race info files:
         Each file is placed into 'output(BASE_PATH)/kaisai_date/kaisai_name/'
-        To get race info, Use race_params.json to jump each race card page.
-        (dir and json file are already created by FileStructure.setup_file_structure)
+        To get race info, jump each race card page by collected params.
 
         race_{num}.csv:
             file for storing each time odds in each race.
@@ -48,14 +46,13 @@ class Settings(Base):
 
             heaeder: name, odds, time
 
-        times.json:
-            file that contains each race's start time.
-            this file is used to setup schedule .
-            generated from self._generate_times_file.
-            regardless of races, generate 1 file by 1 kaisai.
-
-            key: race_num
-            value: start_time(yyyymmddhhmm)
+        manifest.json:
+            placed into 'output(BASE_PATH)/kaisai_date/'.
+            day manifest(DayManifest) that contains each kaisai's races,
+            race_card params and start times(yyyymmddhhmm).
+            later stages(odds_setting.py, exe_job.py, post_process.py) load it once.
+            regardless of kaisai, generate 1 file by 1 kaisai_date.
+            on rerun, existing file is updated and fields of later stages are kept.
     """
 
     def __init__(self) -> None:
@@ -71,29 +68,61 @@ class Settings(Base):
         else:
             pass
 
-        dirs = list(starmap(self.file_structure_stream, self.kaisai_params))
+        kaisai_list = concurrent_starmap(
+            self.file_structure_stream, self.kaisai_params, self.CRAWL_MAX_WORKERS
+        )
 
         print("========File structure created========")
 
-        for dir_ in dirs:
-            dir_path = self.BASE_PATH / dir_
-            file_path = dir_path / "race_params.json"
+        # race cards of all kaisai are crawled concurrently
+        manifests = {}
+        race_card_params = []
+        for date_, name, race_card_dict in kaisai_list:
+            if date_ not in manifests:
+                manifests[date_] = self._load_manifest(date_)
+            else:
+                pass
+
+            manifest = manifests[date_]
+            dir_path = self.BASE_PATH / f"{date_}/{name}"
+
+            for race_num, param in race_card_dict.items():
+                manifest.set_race(name, race_num, race_card=param)
+                race_card_params.append(
+                    RaceCardParam(dir_=dir_path, race_num=race_num, param=param)
+                )
 
-            race_card_dict = read_json(file_path)
-            race_card_params = [
-                RaceCardParam(dir_=dir_path, race_num=race_num, param=param)
-                for race_num, param in race_card_dict.items()
-            ]
+        start_times = concurrent_starmap(
+            self.files_stream, race_card_params, self.CRAWL_MAX_WORKERS
+        )
 
-            times = dict(starmap(self.files_stream, race_card_params))
-            dict_to_json(dir_path / "times.json", times)
+        for race_card_param, (race_num, start_time) in zip(
+            race_card_params, start_times
+        ):
+            dir_path = race_card_param.dir_
+            manifest = manifests[dir_path.parent.name]
+            manifest.set_race(dir_path.name, race_num, time=start_time)
 
-            print(f"{dir_} {len(times.keys())} race created")
+        for date_, manifest in manifests.items():
+            manifest.save(self.BASE_PATH / date_)
+
+            for name in manifest.kaisai_names:
+                print(f"{date_}/{name} {len(manifest.times(name))} race created")
 
         print("======All Files created======")
 
         return None
 
+    def _load_manifest(self, date_: str) -> DayManifest:
+        """Manifest of date_ to update.
+        On rerun, existing manifest.json is updated, so fields added by later
+        stages(odds params by OddsSetting, result params by RaceResults) are kept.
+        """
+        if (self.BASE_PATH / date_ / MANIFEST_FILE).exists():
+            return DayManifest.load(self.BASE_PATH / date_)
+        else:
+            return DayManifest(date_)
+
     @property
     def kaisai_params(self) -> list[NamedTuple]:
         """Params to jump kaisai page from kaisai_list page.
@@ -141,25 +170,24 @@ class Settings(Base):
 
         return kaisai_params
 
-    def file_structure_stream(self, date_: str, name: str, param: str) -> str:
-        """For itertools.starmap, gather methods to use KaisaiParam.
+    def file_structure_stream(self, date_: str, name: str, param: str) -> tuple:
+        """For concurrent_starmap, gather methods to use KaisaiParam.
         Params date_, name, param are KaisaiParam's field names.
 
         Function stream:
             make race_card_params,
             create dir,
-            genearete race_card_params file.
+            and return (date_, name, race_card_params).
 
         """
         dir_path = self.BASE_PATH / f"{date_}/{name}"
         race_card_params = self._make_race_card_params(param)
 
         create_folders(dir_path)
-        dict_to_json(dir_path / "race_params.json", race_card_params)
 
         print("".join([date_, name]))
 
-        return "/".join([date_, name])
+        return (date_, name, race_card_params)
 
     def _make_race_card_params(self, kaisai_param: str) -> dict[str, str]:
         """Get params to jump race_card page from kaisai page.
@@ -195,7 +223,7 @@ class Settings(Base):
         return race_card_dict
 
     def files_stream(self, dir_path: Path, race_num: str, param: str) -> tuple:
-        """For itertools.starmap, gather methods to use RaceCardParam.
+        """For concurrent_starmap, gather methods to use RaceCardParam.
         Params dir_path, race_num, param are RaceCardParam's field names.
 
         Function stream:
@@ -247,3 +275,6 @@ class Settings(Base):
 if __name__ == "__main__":
     settings = Settings()
     settings.execute()
+
+    print(f"request stats: {get_session().stats}")
+    print(f"response cache stats: {response_cache_stats()}")
@@ -1,8 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from bs4 import BeautifulSoup
+
 from keiba.base import Base
-from keiba.utils.file_utils import append_to_csv, read_json
-from keiba.utils.keiba_utils import get_jra_soup_object
+from keiba.utils.keiba_utils import (
+    get_jra_content,
+    odds_list_strainer,
+    parse_jra_html,
+    slice_table_html,
+)
+from keiba.utils.metrics_utils import metrics
+from keiba.utils.odds_utils import DayOddsStore, RaceOddsStore
+from keiba.utils.storage_utils import make_odds_writer
+
+from bet_odds import BET_TYPES, BetOdds
 
 
 class Odds(Base):
@@ -24,54 +36,102 @@ class Odds(Base):
 
     race_num: str
         Target race number to execute.
+
+    odds_param: str
+        jra page parameter to jump odds page.(odds field of day manifest)
+
+    store: RaceOddsStore
+        If given, each snapshot is also kept in memory. (for live odds api)
     """
 
-    def __init__(self, kaisai_date: str, kaisai_name: str, race_num: str) -> None:
+    def __init__(
+        self,
+        kaisai_date: str,
+        kaisai_name: str,
+        race_num: str,
+        odds_param: str,
+        store: RaceOddsStore = None,
+    ) -> None:
         super().__init__()
         self.kaisai_date = kaisai_date
         self.kaisai_name = kaisai_name
         self.race_num = race_num
+        self.odds_param = odds_param
         self.dir_path = self.BASE_PATH / f"{self.kaisai_date}/{self.kaisai_name}"
-        self.race_file_path = self.dir_path / f"race_{self.race_num}.csv"
-        self.header = ["name", "odds", "time"]
+        self.writer = make_odds_writer(
+            self.ODDS_STORAGE,
+            self.dir_path,
+            self.race_num,
+            self.ODDS_FLUSH_SNAPSHOTS,
+            self.CSV_FLUSH_ROWS,
+            self.CSV_FLUSH_INTERVAL,
+            self.CSV_FSYNC,
+        )
+        self.store = store
+        # labels of metrics spans
+        self.labels = {"kaisai": self.kaisai_name, "race": self.race_num}
 
         return None
 
-    def job(self) -> None:
+    def job(self) -> bytes:
         """
         Main job to execute by scheduler.
         Get horse name, odds value, and current time, then append csv file.
+        Returns raw odds_page content.(other bet types are parsed from it)
+        """
+        now_ = datetime.now()
+
+        content = self._fetch_odds_content(self.odds_param)
+        odds_list = self._extract_odds(content, now_)
+        self._write_odds(odds_list)
+
+        return content
+
+    def _write_odds(self, odds_list: list) -> None:
+        """
+        Write odds snapshot by writer selected with Base.ODDS_STORAGE.
+        csv: append rows changed from last snapshot into race_{num}.csv,
+             through file handle kept open.
+        parquet: buffer and flush as race_{num}_{seq}.parquet.
         """
+        with metrics.span("odds_write", **self.labels):
+            self.writer.write(odds_list)
 
-        odds_list = self._get_odds_values(self.odds_param)
-        append_to_csv(self.race_file_path, self.header, odds_list)
+        if self.store is not None:
+            self.store.append(odds_list)
+        else:
+            pass
+
+        return None
+
+    def flush(self) -> None:
+        """Flush buffered snapshots. Call this before shutdown."""
+        self.writer.flush()
 
         return None
 
     @property
-    def odds_param(self) -> str:
-        """
-        jra odds page params read from 'odds_params.json',
-        (generated by file_setteings.py) and return a target race's param only.
+    def write_count(self) -> int:
+        """Number of snapshots written."""
+        return self.writer.write_count
 
-        Returns
-        -------
-        odds_param: str
-            jra page parameter to jump odds page
-        """
-        params = read_json(self.dir_path / "odds_params.json")
+    @property
+    def flushed_count(self) -> int:
+        """Number of snapshots flushed by writer. (not lost on hard kill)"""
+        return self.writer.flushed_count
 
-        return params[self.race_num]
+    def _fetch_odds_content(self, odds_param: str) -> bytes:
+        """Get raw odds_page content, measured as odds_fetch span."""
+        with metrics.span("odds_fetch", **self.labels):
+            content = get_jra_content(self.BASE_URL, odds_param)
 
-    def _get_odds_values(self, odds_param: str) -> list:
-        """
-        Get each horse's odds value from jra odds_page,
-        and return it by list.
+        return content
 
-        Parameters
-        ----------
-        odds_param: str
-            Use to jump jra odds_page.
+    def _extract_odds(self, content: bytes, now_: datetime) -> list:
+        """
+        Get each horse's odds value from raw odds_page content,
+        and return it by list. (self._parse_odds_content,
+        measured as odds_extract span)
 
         Returns
         -------
@@ -109,10 +169,37 @@ class Odds(Base):
                 ...
             ]
         """
-        now_ = datetime.now()
+        with metrics.span("odds_extract", **self.labels):
+            odds_list = self._parse_odds_content(content, now_)
+
+        return odds_list
+
+    @classmethod
+    def _parse_odds_content(cls, content: bytes, now_: datetime) -> list:
+        """
+        Get each horse's odds value from raw odds_page content.
+        Only odds_list table is decoded from shift-jis bytes and parsed.
+        If table can't be located in bytes, decode and parse whole page.
+        Returns odds_list, same as self._extract_odds.
+        """
+        odds_html = slice_table_html(content, "odds_list")
+        if odds_html is None:
+            odds_html = content.decode("shift-jis", errors="replace")
+        else:
+            pass
+
+        odds_soup = parse_jra_html(odds_html, parse_only=odds_list_strainer())
+
+        return cls._parse_odds_soup(odds_soup, now_)
+
+    @staticmethod
+    def _parse_odds_soup(odds_soup: BeautifulSoup, now_: datetime) -> list:
+        """
+        Get each horse's odds value from parsed odds_page.
+        Returns odds_list, same as self._extract_odds.
+        """
         odds_list = []
 
-        odds_soup = get_jra_soup_object(self.BASE_URL, odds_param)
         tr_list = odds_soup.find(id="odds_list").find("tbody").find_all("tr")
 
         for tr in tr_list:
@@ -125,3 +212,173 @@ class Odds(Base):
             odds_list.append(odds_dict)
 
         return odds_list
+
+
+class KaisaiOdds(Base):
+    """
+    Generate odds getting job of 1 kaisai(venue).
+    Generated job collects all races due at the same time in one pass:
+    every race shares 1 snapshot time,
+    pages are fetched concurrently through the shared session,
+    and odds rows are fanned out to each race's stored file(race_{num}.csv).
+    If a race's page can't be collected in the pass,
+    fall back to that race's own Odds.job.
+
+    Odds of other bet types(Base.ODDS_BET_TYPES, see bet_odds.py)
+    are collected in the same pass. Place odds are parsed from the win odds
+    page already fetched, and combination odds pages are fetched concurrently,
+    each bet type at most once in its interval(Base.ODDS_BET_INTERVALS).
+
+    JRA's kaisai odds page only links to each race's odds page
+    (it has no odds values), so each race's page is still requested.
+
+    Parameters
+    ----------
+    kaisai_date: str
+        Target date to execute.
+        It's format should be jra_format.
+        Ex: '1月23日（土曜）'
+
+    kaisai_name: str
+        Target name to execute.
+        Ex: '1回小倉5日'
+
+    odds_params: dict
+        key: race number
+        value: jra page parameter to jump odds page
+        (DayManifest.params(kaisai_name, "odds"))
+
+    bet_params: dict
+        key: bet type name
+        value: dict(key: race number, value: page parameter of its odds page)
+        (DayManifest.params(kaisai_name, f"odds_{bet type name}"))
+
+    day_store: DayOddsStore
+        If given, each race's snapshots are also kept in memory. (for live odds api)
+    """
+
+    def __init__(
+        self,
+        kaisai_date: str,
+        kaisai_name: str,
+        odds_params: dict,
+        day_store: DayOddsStore = None,
+        bet_params: dict = None,
+    ) -> None:
+        super().__init__()
+        self.kaisai_date = kaisai_date
+        self.kaisai_name = kaisai_name
+        self.dir_path = self.BASE_PATH / f"{self.kaisai_date}/{self.kaisai_name}"
+        self.odds_params = odds_params
+        self.races = {
+            race_num: Odds(
+                kaisai_date,
+                kaisai_name,
+                race_num,
+                odds_param,
+                day_store.race(kaisai_name, race_num) if day_store else None,
+            )
+            for race_num, odds_param in self.odds_params.items()
+        }
+
+        # key: race number, value: list of BetOdds
+        self.bets = {race_num: [] for race_num in self.odds_params.keys()}
+        bet_params = bet_params if bet_params is not None else {}
+        bet_intervals = dict(self.ODDS_BET_INTERVALS)
+        for bet_name in self.ODDS_BET_TYPES:
+            bet_type = BET_TYPES[bet_name]
+            if bet_type.win_page:
+                params = dict.fromkeys(self.odds_params.keys())
+            else:
+                params = bet_params.get(bet_name, {})
+
+            for race_num, param in params.items():
+                self.bets[race_num].append(
+                    BetOdds(
+                        kaisai_date,
+                        kaisai_name,
+                        race_num,
+                        bet_type,
+                        param,
+                        bet_intervals.get(bet_name, 0.0),
+                    )
+                )
+
+        return None
+
+    def job(self, race_nums: list) -> list:
+        """
+        Main job to execute by scheduler.
+        Get odds of race_nums in one pass, then append each race's csv file.
+        Returns race numbers whose odds were written.(to checkpoint them only)
+        """
+        now_ = datetime.now()
+        params = [self.odds_params[race_num] for race_num in race_nums]
+        bets = [
+            bet
+            for race_num in race_nums
+            for bet in self.bets[race_num]
+            if bet.is_due(now_)
+        ]
+
+        with ThreadPoolExecutor(max_workers=self.ODDS_MAX_WORKERS) as executor:
+            futures = [
+                executor.submit(self.races[race_num]._fetch_odds_content, param)
+                for race_num, param in zip(race_nums, params)
+            ]
+            # None for bet types parsed from win odds page
+            bet_futures = [
+                None if bet.bet_type.win_page else executor.submit(bet._fetch_content)
+                for bet in bets
+            ]
+
+        # win odds page content, reused by bet types parsed from it
+        win_contents = {}
+        written = []
+        for race_num, future in zip(race_nums, futures):
+            race = self.races[race_num]
+
+            try:
+                win_contents[race_num] = future.result()
+                odds_list = race._extract_odds(win_contents[race_num], now_)
+            except Exception as exc:
+                print(f"{self.kaisai_name} {race_num}R fall back: {exc!r}")
+            else:
+                race._write_odds(odds_list)
+                written.append(race_num)
+                continue
+
+            # other races' pages are already fetched, so keep writing them
+            # even if fallback fails too
+            try:
+                win_contents[race_num] = race.job()
+            except Exception as exc:
+                print(f"{self.kaisai_name} {race_num}R fall back failed: {exc!r}")
+                continue
+            else:
+                written.append(race_num)
+
+        for bet, bet_future in zip(bets, bet_futures):
+            try:
+                if bet_future is None:
+                    content = win_contents[bet.race_num]
+                else:
+                    content = bet_future.result()
+
+                bet.write(content, now_)
+            except Exception as exc:
+                bet_name = bet.bet_type.name
+                print(f"{self.kaisai_name} {bet.race_num}R {bet_name}: {exc!r}")
+
+        return written
+
+    def flush(self) -> None:
+        """Flush buffered snapshots of all races. Call this before shutdown."""
+        for race in self.races.values():
+            race.flush()
+
+        for bets in self.bets.values():
+            for bet in bets:
+                bet.flush()
+
+        return None
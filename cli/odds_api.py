@@ -0,0 +1,168 @@
+import json
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from keiba.utils.odds_utils import DayOddsStore
+
+
+def _json_value(value):
+    """NaN is not valid json, convert it to None.
+    float32 odds are rounded to remove noise(ex. 1.2999999523 -> 1.3).
+    """
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    elif isinstance(value, float):
+        return round(value, 2)
+    elif isinstance(value, (tuple, list)):
+        return [_json_value(v) for v in value]
+    else:
+        return value
+
+
+class OddsApi:
+    """Live odds query api over DayOddsStore, served from memory.
+    Used in-process, or through OddsApiServer(local http).
+
+    Parameters
+    ----------
+    day_store: DayOddsStore
+        store filled by collector.
+    """
+
+    def __init__(self, day_store: DayOddsStore) -> None:
+        self.day_store = day_store
+
+        return None
+
+    def races(self) -> list:
+        """Stored races, list of {kaisai, race, ticks}."""
+        return [
+            {
+                "kaisai": kaisai_name,
+                "race": race_num,
+                "ticks": len(self.day_store.get(kaisai_name, race_num)),
+            }
+            for kaisai_name, race_num in self.day_store.keys()
+        ]
+
+    def latest(self, kaisai_name: str, race_num: str) -> dict:
+        """Latest odds of race. see RaceOddsStore.latest."""
+        latest_ = self._race(kaisai_name, race_num).latest()
+        latest_["odds"] = {k: _json_value(v) for k, v in latest_["odds"].items()}
+
+        return latest_
+
+    def delta(self, kaisai_name: str, race_num: str, minutes: float) -> dict:
+        """Odds change over the last minutes. see RaceOddsStore.delta."""
+        delta_ = self._race(kaisai_name, race_num).delta(minutes)
+        delta_["odds"] = {
+            k: dict(zip(("base", "latest", "change"), _json_value(v)))
+            for k, v in delta_["odds"].items()
+        }
+
+        return delta_
+
+    def series(self, kaisai_name: str, race_num: str, name: str) -> list:
+        """Time series of 1 horse, list of [time, odds]."""
+        race = self._race(kaisai_name, race_num)
+
+        return [_json_value(point) for point in race.series(name)]
+
+    def _race(self, kaisai_name: str, race_num: str):
+        race = self.day_store.get(kaisai_name, race_num)
+        if race is None:
+            raise KeyError(f"{kaisai_name} {race_num}R")
+        else:
+            pass
+
+        return race
+
+
+class OddsApiServer:
+    """Local http endpoint of OddsApi, runs in daemon thread.
+
+    GET /races
+    GET /races/{kaisai_name}/{race_num}/latest
+    GET /races/{kaisai_name}/{race_num}/delta?minutes=N
+    GET /races/{kaisai_name}/{race_num}/series?name={horse_name}
+
+    Parameters
+    ----------
+    api: OddsApi
+
+    port: int
+        Port to listen. Bound to 127.0.0.1 only.
+    """
+
+    def __init__(self, api: OddsApi, port: int) -> None:
+        self.api = api
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name="odds-api", daemon=True
+        )
+
+        return None
+
+    def start(self) -> None:
+        self.thread.start()
+        print(f"odds api listening on 127.0.0.1:{self.server.server_address[1]}")
+
+        return None
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+        return None
+
+    def _make_handler(self):
+        api = self.api
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                parts = [unquote(part) for part in url.path.strip("/").split("/")]
+                query = parse_qs(url.query)
+
+                try:
+                    if parts == ["races"]:
+                        body = api.races()
+                    elif (len(parts) == 4) and (parts[0] == "races"):
+                        _, kaisai_name, race_num, kind = parts
+                        if kind == "latest":
+                            body = api.latest(kaisai_name, race_num)
+                        elif kind == "delta":
+                            minutes = float(query.get("minutes", ["10"])[0])
+                            body = api.delta(kaisai_name, race_num, minutes)
+                        elif kind == "series":
+                            name = query["name"][0]
+                            body = api.series(kaisai_name, race_num, name)
+                        else:
+                            raise KeyError(kind)
+                    else:
+                        raise KeyError(url.path)
+                except KeyError as exc:
+                    self._send(404, {"error": f"not found: {exc}"})
+                except ValueError as exc:
+                    self._send(400, {"error": str(exc)})
+                else:
+                    self._send(200, body)
+
+                return None
+
+            def _send(self, status: int, body) -> None:
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+                return None
+
+            def log_message(self, format, *args) -> None:
+                return None
+
+        return Handler
@@ -1,11 +1,15 @@
 import sys
-from itertools import starmap
 from typing import NamedTuple
 
 from keiba.base import Base
+from keiba.utils.cache_utils import response_cache_stats
+from keiba.utils.concurrent_utils import concurrent_starmap
 from keiba.utils.date_utils import yyyymmdd_to_jra_date
-from keiba.utils.file_utils import dict_to_json
+from keiba.utils.http_utils import get_session
 from keiba.utils.keiba_utils import get_jra_soup_object, get_page_param
+from keiba.utils.manifest_utils import DayManifest
+
+from bet_odds import BET_TYPES
 
 
 class KaisaiParam(NamedTuple):
@@ -13,29 +17,62 @@ class KaisaiParam(NamedTuple):
     param: str
 
 
+class RaceOddsParam(NamedTuple):
+    name: str
+    race_num: str
+    param: str
+
+
 class OddsSetting(Base):
     """Setup to get odds data.
 
-    Generate params file to jump each odds page.
+    Add params to jump each odds page into day manifest.
 
     file structure:
-        output(BASE_PATH)/kaisai_date/(each kaisai_name)/
+        output(BASE_PATH)/kaisai_date/manifest.json
 
-        (each kaisai_name)/odds_params.json:
-            key: race number
-            value: page parameter(to jump each odds page)
+        odds field of each race is page parameter(to jump each odds page).
+        odds_{bet type name} fields are page parameters of other bet types
+        (Base.ODDS_BET_TYPES), found in links of each race's odds page.
     """
 
     def __init__(self, yyyymmdd: str) -> None:
         super().__init__()
         self.kaisai_date = yyyymmdd_to_jra_date(yyyymmdd)
+        self.dir_path = self.BASE_PATH / self.kaisai_date
 
         return None
 
     def setup_odds(self) -> None:
-        result_ = list(starmap(self.func_stream, self.kaisai_params))
+        result_ = concurrent_starmap(
+            self.func_stream, self.kaisai_params, self.CRAWL_MAX_WORKERS
+        )
+
+        manifest = DayManifest.load(self.dir_path)
+        race_odds_params = []
+        for name, odds_params in result_:
+            for race_num, param in odds_params.items():
+                manifest.set_race(name, race_num, odds=param)
+                race_odds_params.append(
+                    RaceOddsParam(name=name, race_num=race_num, param=param)
+                )
+
+        if any(not BET_TYPES[bet].win_page for bet in self.ODDS_BET_TYPES):
+            bet_params_list = concurrent_starmap(
+                self.bet_params_stream, race_odds_params, self.CRAWL_MAX_WORKERS
+            )
+            for race_odds_param, bet_params in zip(race_odds_params, bet_params_list):
+                manifest.set_race(
+                    race_odds_param.name,
+                    race_odds_param.race_num,
+                    **{f"odds_{bet}": param for bet, param in bet_params.items()},
+                )
+        else:
+            pass
+
+        manifest.save(self.dir_path)
 
-        print(f"========{len(result_)} files created========")
+        print(f"========{len(result_)} kaisai added to manifest========")
 
         return None
 
@@ -92,25 +129,59 @@ class OddsSetting(Base):
 
         return kaisai_params
 
-    def func_stream(self, name: str, param: str) -> None:
-        """For itertools.starmap, gather methods to use KaisaiParam.
+    def func_stream(self, name: str, param: str) -> tuple:
+        """For concurrent_starmap, gather methods to use KaisaiParam.
         Params name, param are KaisaiParam's field names.
 
         Function stream:
             make odds_params,
             get total race num,
-            genearete odds_params file.
+            and return (name, odds_params).
         """
 
         odds_params = self._get_odds_params(param)
         total_race = len(odds_params.keys())
 
-        dir_path = self.BASE_PATH / f"{self.kaisai_date}/{name}"
-        dict_to_json(dir_path / "odds_params.json", odds_params)
-
         print(f"{name} created, {total_race}races")
 
-        return None
+        return (name, odds_params)
+
+    def bet_params_stream(self, name: str, race_num: str, param: str) -> dict:
+        """For concurrent_starmap, gather methods to use RaceOddsParam.
+        Params name, race_num, param are RaceOddsParam's field names.
+
+        Get params to jump odds pages of other bet types from race's odds page.
+        Links are matched by cname prefix of each bet type.
+
+        Returns
+        -------
+        dict
+            key: bet type name
+            value: page parameter
+        """
+        bet_types = [
+            BET_TYPES[bet_name]
+            for bet_name in self.ODDS_BET_TYPES
+            if not BET_TYPES[bet_name].win_page
+        ]
+        bet_params = {}
+
+        odds_soup = get_jra_soup_object(self.BASE_URL, param)
+        for a_tag in odds_soup.find_all("a", onclick=True):
+            try:
+                page_param = get_page_param(a_tag)
+            except IndexError:
+                continue
+
+            for bet_type in bet_types:
+                if page_param.startswith(bet_type.cname_prefix):
+                    bet_params.setdefault(bet_type.name, page_param)
+                else:
+                    pass
+
+        print(f"{name} {race_num}R bet types: {list(bet_params.keys())}")
+
+        return bet_params
 
     def _get_odds_params(self, kaisai_param: NamedTuple) -> dict[str, str]:
         """Get params to jump odds page from kaisai page.
@@ -149,3 +220,6 @@ class OddsSetting(Base):
 if __name__ == "__main__":
     a = OddsSetting(sys.argv[1])
     a.setup_odds()
+
+    print(f"request stats: {get_session().stats}")
+    print(f"response cache stats: {response_cache_stats()}")
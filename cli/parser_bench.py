@@ -0,0 +1,81 @@
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from keiba.utils.keiba_utils import odds_list_strainer, parse_jra_html, select_parser
+
+from odds import Odds
+
+
+def make_backends() -> dict:
+    """Odds page extraction backends to compare.
+    Each backend takes raw(shift-jis bytes) content and returns odds_list.
+
+    Returns
+    -------
+    dict
+        key: backend name
+        value: function(content, now_)
+    """
+
+    def full_decode(parser, parse_only):
+        def backend(content, now_):
+            html = content.decode("shift-jis", errors="replace")
+            odds_soup = parse_jra_html(html, parser=parser, parse_only=parse_only)
+            return Odds._parse_odds_soup(odds_soup, now_)
+
+        return backend
+
+    backends = {
+        "html.parser": full_decode("html.parser", None),
+        "html.parser+strainer": full_decode("html.parser", odds_list_strainer()),
+    }
+
+    if select_parser("lxml") == "lxml":
+        backends["lxml"] = full_decode("lxml", None)
+        backends["lxml+strainer"] = full_decode("lxml", odds_list_strainer())
+    else:
+        print("lxml is not installed, skip lxml backends")
+
+    backends["bytes-slice"] = Odds._parse_odds_content
+
+    return backends
+
+
+def bench_page(content: bytes, backend, repeat: int) -> tuple:
+    """Return mean seconds and peak allocated bytes to extract odds_list."""
+    now_ = datetime.now()
+
+    start_ = time.perf_counter()
+    for _ in range(repeat):
+        backend(content, now_)
+    elapsed = time.perf_counter() - start_
+
+    tracemalloc.start()
+    backend(content, now_)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return (elapsed / repeat, peak)
+
+
+if __name__ == "__main__":
+    # usage: python parser_bench.py saved_odds_page.html [...]
+    # saved pages are raw(shift-jis) responses of jra odds page
+    repeat = 20
+    backends = make_backends()
+
+    for page_path in map(Path, sys.argv[1:]):
+        content = page_path.read_bytes()
+        print(f"===={page_path.name}====")
+
+        base_time = None
+        for name, backend in backends.items():
+            sec, peak = bench_page(content, backend, repeat)
+            base_time = base_time or sec
+            print(
+                f"{name}: {sec * 1000:.2f} ms/page, x{base_time / sec:.1f}, "
+                f"peak {peak / 1024:.0f} KiB"
+            )
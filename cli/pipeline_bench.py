@@ -0,0 +1,103 @@
+import os
+import resource
+import socket
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+def measure(name: str, func) -> dict:
+    """Run func, and measure wall time, cpu time, requests and peak rss."""
+    from keiba.utils.http_utils import get_session
+
+    session = get_session()
+    requests_ = session.request_count
+    wall_ = time.perf_counter()
+    cpu_ = time.process_time()
+
+    func()
+
+    result_ = {
+        "stage": name,
+        "wall_sec": round(time.perf_counter() - wall_, 3),
+        "cpu_sec": round(time.process_time() - cpu_, 3),
+        "requests": session.request_count - requests_,
+        # ru_maxrss is KiB on linux, process peak until now
+        "peak_rss_mib": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+    }
+    print(result_)
+
+    return result_
+
+
+def run_bench(yyyymmdd: str) -> list:
+    """Run whole pipeline of yyyymmdd end-to-end:
+    Settings -> OddsSetting -> simulated exe_job day -> RaceResults.
+    """
+    from keiba.base import Base
+    from keiba.utils.date_utils import yyyymmdd_to_jra_date
+    from keiba.utils.manifest_utils import DayManifest
+
+    from exe_job import collect_odds
+    from file_setting import Settings
+    from odds_setting import OddsSetting
+    from post_process import RaceResults
+    from tick_scheduler import SimClock
+
+    kaisai_date = yyyymmdd_to_jra_date(yyyymmdd)
+
+    def simulate_day():
+        # simulated clock starts 9 hours before the first race
+        manifest = DayManifest.load(Base.BASE_PATH / kaisai_date)
+        first_time = datetime.strptime(manifest.by_time[0][0], "%Y%m%d%H%M")
+        clock = SimClock(first_time.timestamp() - 9 * 60 * 60)
+        s = collect_odds(kaisai_date, clock=clock.time, sleep=clock.sleep)
+        print(f"tick stats: {s.stats}")
+
+    return [
+        measure("Settings", Settings().execute),
+        measure("OddsSetting", OddsSetting(yyyymmdd).setup_odds),
+        measure("exe_job(simulated day)", simulate_day),
+        measure("RaceResults", RaceResults(yyyymmdd).generate_results),
+    ]
+
+
+if __name__ == "__main__":
+    # usage: python pipeline_bench.py record_dir yyyymmdd [latency] [jitter]
+    # record_dir is saved by record mode(env KEIBA_RECORD_PATH) on that day.
+    record_dir = Path(sys.argv[1])
+    yyyymmdd = sys.argv[2]
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    jitter = float(sys.argv[4]) if len(sys.argv) > 4 else 0.02
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Base reads these when imported, so keiba modules are imported after this
+        os.environ["KEIBA_BASE_URL"] = f"http://127.0.0.1:{port}/JRADB/accessO.html"
+        os.environ["KEIBA_BASE_PATH"] = tmp_dir
+        os.environ["KEIBA_RESPONSE_CACHE_PATH"] = str(Path(tmp_dir) / "cache")
+        os.environ.pop("KEIBA_RECORD_PATH", None)
+
+        from replay_server import ReplayServer
+
+        replay = ReplayServer(record_dir, port, latency, jitter)
+        replay.start()
+
+        results = run_bench(yyyymmdd)
+
+        replay.stop()
+
+    from keiba.utils.file_utils import json_cache_stats
+
+    # manifest.json is loaded by each stage
+    print(f"json cache stats: {json_cache_stats()}")
+
+    total_wall = sum(result_["wall_sec"] for result_ in results)
+    print(f"======total {total_wall:.3f} s, {replay.request_count} requests======")
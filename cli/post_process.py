@@ -1,10 +1,25 @@
 import sys
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+from bs4 import BeautifulSoup
 
-import boto3
 from keiba.base import Base
+from keiba.utils.archive_utils import ArchiveUploader
+from keiba.utils.cache_utils import response_cache_stats
+from keiba.utils.concurrent_utils import concurrent_starmap
 from keiba.utils.date_utils import yyyymmdd_to_jra_date
-from keiba.utils.file_utils import dict_to_json, read_json
+from keiba.utils.file_utils import dict_to_json, json_cache_stats
+from keiba.utils.http_utils import get_session
 from keiba.utils.keiba_utils import get_jra_soup_object, get_page_param
+from keiba.utils.manifest_utils import MANIFEST_FILE, DayManifest
+
+
+class RaceResultParam(NamedTuple):
+    kaisai_path: Path
+    race_num: str
+    param: str
 
 
 class RaceResults(Base):
@@ -14,39 +29,105 @@ class RaceResults(Base):
         super().__init__()
         self.kaisai_date = yyyymmdd_to_jra_date(yyyymmdd)
         self.dir_path = self.BASE_PATH / self.kaisai_date
+        self.manifest = DayManifest.load(self.dir_path)
 
     def generate_results(self):
+        """Crawl all races of all kaisai concurrently.
+        Each race's 2 page loads(race card -> result page) run in 1 worker,
+        so races are pipelined. Failed race is retried,
+        and if still failing, it's left out of race_result.json
+        without aborting the others.
+        Found result page params are saved into day manifest,
+        so the race card is not loaded again on rerun.
+        """
         print("Create result files")
-        for kaisai_path in self.dir_path.iterdir():
-            kaisai_name = kaisai_path.name
-            kaisai_dict = {}
 
-            race_page_params = read_json(kaisai_path / "race_params.json")
+        race_result_params = []
+        for kaisai_name in self.manifest.kaisai_names:
+            race_page_params = self.manifest.params(kaisai_name, "race_card")
+            race_result_params.extend(
+                RaceResultParam(
+                    kaisai_path=self.dir_path / kaisai_name,
+                    race_num=race_num,
+                    param=param,
+                )
+                for race_num, param in race_page_params.items()
+            )
 
-            for race_num, param in race_page_params.items():
-                result_param = self._get_result_param(param)
+        place_dicts = concurrent_starmap(
+            self.result_stream, race_result_params, self.CRAWL_MAX_WORKERS
+        )
 
-                place_dict = self._make_place_dict(result_param)
-                kaisai_dict[race_num] = place_dict
+        kaisai_dicts = {}
+        for race_result_param, place_dict in zip(race_result_params, place_dicts):
+            kaisai_dict = kaisai_dicts.setdefault(race_result_param.kaisai_path, {})
+            if place_dict is not None:
+                kaisai_dict[race_result_param.race_num] = place_dict
+            else:
+                pass
 
+        for kaisai_path, kaisai_dict in kaisai_dicts.items():
             dict_to_json(
                 kaisai_path / "race_result.json", kaisai_dict, ensure_ascii=False
             )
-            print(f"{kaisai_name} done")
+            print(f"{kaisai_path.name} done")
+
+        self.manifest.save(self.dir_path)
 
         print("======All Results created======")
 
         return None
 
+    def result_stream(self, kaisai_path: Path, race_num: str, param: str) -> dict:
+        """For concurrent_starmap, gather methods to use RaceResultParam.
+        Params kaisai_path, race_num, param are RaceResultParam's field names.
+
+        Function stream:
+            get result page param from race card page(if not in day manifest),
+            make place dict from result page.
+            retry up to RESULT_RETRIES times with backoff(no wait after last one),
+            and return None if all failed.
+        """
+        race = self.manifest.kaisai[kaisai_path.name][race_num]
+
+        for attempt in range(self.RESULT_RETRIES + 1):
+            try:
+                if "result" not in race:
+                    race["result"] = self._get_result_param(param)
+                else:
+                    pass
+
+                result_param = race["result"]
+                place_dict = self._make_place_dict(result_param)
+            except Exception as exc:
+                print(f"{kaisai_path.name} {race_num}R failed({attempt + 1}): {exc!r}")
+                if attempt < self.RESULT_RETRIES:
+                    time.sleep(self.REQUEST_BACKOFF * (2 ** attempt))
+                else:
+                    pass
+            else:
+                return place_dict
+
+        return None
+
     def _get_result_param(self, race_page_param: str) -> str:
         """Get jra result page's params from race_card_page.
-        To jump to jra race_card_page, use each kaisai's race_params.json.
+        To jump to jra race_card_page, use race_card param of day manifest.
+        race_card_page cached before the race has no result link,
+        so in that case it's fetched again without cache.
         """
 
         race_card_soup = get_jra_soup_object(self.BASE_URL, race_page_param)
-        result_a_tag = (
-            race_card_soup.find(class_="race_header").find(class_="result").find("a")
-        )
+        result_tag = race_card_soup.find(class_="race_header").find(class_="result")
+        if (result_tag is None) or (result_tag.find("a") is None):
+            race_card_soup = get_jra_soup_object(
+                self.BASE_URL, race_page_param, refresh=True
+            )
+            result_tag = race_card_soup.find(class_="race_header").find(class_="result")
+        else:
+            pass
+
+        result_a_tag = result_tag.find("a")
         result_param = get_page_param(result_a_tag)
 
         return result_param
@@ -70,9 +151,17 @@ class RaceResults(Base):
             }
         """
 
+        result_soup = get_jra_soup_object(Base.BASE_URL, result_param)
+
+        return self._parse_place_dict(result_soup)
+
+    @staticmethod
+    def _parse_place_dict(result_soup: BeautifulSoup) -> dict[str, str]:
+        """Place dict from parsed race_result_page.
+        Returns place dict, same as self._make_place_dict.
+        """
         results_dict = {}
 
-        result_soup = get_jra_soup_object(Base.BASE_URL, result_param)
         tr_list = (
             result_soup.find(class_="race_result_unit").find("tbody").find_all("tr")
         )
@@ -93,6 +182,7 @@ class FileArchive(Base):
         self.yyyymmdd = yyyymmdd
         self.kaisai_date = yyyymmdd_to_jra_date(yyyymmdd)
         self.dir_path = self.BASE_PATH / self.kaisai_date
+        self.manifest = DayManifest.load(self.dir_path)
 
     def execute(self):
 
@@ -104,32 +194,52 @@ class FileArchive(Base):
     def delete_files(self):
         print("Delete times, odds_params")
 
-        # Delete times.json, race_params.json, and odds_params.json if exists
+        # Delete times.json, and odds_params.json if exists(dir created before manifest)
         files = ["times.json", "odds_params.json"]
-        for kaisai_name_path in self.dir_path.iterdir():
-            for f in kaisai_name_path.iterdir():
+        for kaisai_name in self.manifest.kaisai_names:
+            for f in (self.dir_path / kaisai_name).iterdir():
                 if f.name in files:
                     f.unlink(missing_ok=True)
                     print(f"{f.name} deleted")
                 else:
                     pass
 
+        # odds params(odds, odds_{bet type name}) are only used on race day
+        for races in self.manifest.kaisai.values():
+            for race in races.values():
+                for field in [field for field in race if field.startswith("odds")]:
+                    race.pop(field)
+
+        self.manifest.save(self.dir_path)
+
         print("Files deleted")
         return None
 
     def upload_files(self):
-        """Upload race files to aws s3 bucket.
+        """Upload race files and day manifest to aws s3 bucket.
+        Files are uploaded concurrently(ARCHIVE_MAX_WORKERS),
+        and files already uploaded with the same content are skipped.
         """
 
-        s3 = boto3.resource("s3")
-        archive_bucket = s3.Bucket(self.ARCHIVE_BUCKET)
+        uploader = ArchiveUploader(
+            self.ARCHIVE_BUCKET,
+            self.ARCHIVE_MAX_WORKERS,
+            compression=self.ARCHIVE_COMPRESSION,
+            endpoint_url=self.ARCHIVE_ENDPOINT_URL,
+            multipart_threshold=self.ARCHIVE_MULTIPART_THRESHOLD,
+            multipart_chunksize=self.ARCHIVE_MULTIPART_CHUNKSIZE,
+        )
 
-        for kaisai_name_path in self.dir_path.iterdir():
-            kaisai_name = kaisai_name_path.name
-            for f in kaisai_name_path.iterdir():
+        files = [
+            (self.dir_path / MANIFEST_FILE, "/".join([self.yyyymmdd, MANIFEST_FILE]))
+        ]
+        for kaisai_name in self.manifest.kaisai_names:
+            for f in (self.dir_path / kaisai_name).iterdir():
                 file_name = "/".join([self.yyyymmdd, kaisai_name, f.name])
-                archive_bucket.upload_file(str(f), file_name)
-            print(f"{kaisai_name} files uploaded.")
+                files.append((f, file_name))
+
+        summary = uploader.upload_files(files)
+        print(f"upload summary: {summary}")
 
         print("======All files uploaded to S3 bucket======")
 
@@ -142,5 +252,11 @@ if __name__ == "__main__":
     results = RaceResults(yyyymmdd)
     results.generate_results()
 
+    print(f"request stats: {get_session().stats}")
+    print(f"response cache stats: {response_cache_stats()}")
+
     archive = FileArchive(yyyymmdd)
     archive.execute()
+
+    # manifest.json is loaded by RaceResults and FileArchive
+    print(f"json cache stats: {json_cache_stats()}")
@@ -0,0 +1,119 @@
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from keiba.utils.keiba_utils import record_file_path
+
+
+class ReplayServer:
+    """Local stand-in of jra site, serves responses recorded by record mode
+    (Base.RECORD_PATH) back, keyed by posted cname.
+    Each response is delayed latency +- jitter seconds.
+    Not recorded cname returns 404.
+
+    Point Base.BASE_URL(env KEIBA_BASE_URL) at self.url to use it.
+
+    Parameters
+    ----------
+    record_dir: Path
+        dir of recorded responses.
+
+    port: int
+        Port to listen, 0 to choose free port. Bound to 127.0.0.1 only.
+
+    latency: float
+        Seconds to delay each response.
+
+    jitter: float
+        Max seconds added to / subtracted from latency at random.
+    """
+
+    def __init__(
+        self, record_dir: Path, port: int, latency: float = 0.0, jitter: float = 0.0
+    ) -> None:
+        self.record_dir = record_dir
+        self.latency = latency
+        self.jitter = jitter
+        self.request_count = 0
+        self._lock = threading.Lock()
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._make_handler())
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name="replay-server", daemon=True
+        )
+
+        return None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address
+
+        return f"http://{host}:{port}/JRADB/accessO.html"
+
+    def start(self) -> None:
+        self.thread.start()
+
+        return None
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+        return None
+
+    def _delay(self) -> float:
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+
+        return max(delay, 0.0)
+
+    def _make_handler(self):
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive, same as jra site
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length).decode("ascii")
+                cname = parse_qs(body).get("cname", [""])[0]
+
+                with replay._lock:
+                    replay.request_count += 1
+
+                time.sleep(replay._delay())
+
+                file_path = record_file_path(replay.record_dir, cname)
+                if file_path.exists():
+                    status, data = 200, file_path.read_bytes()
+                else:
+                    status, data = 404, b""
+
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=Shift_JIS")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+                return None
+
+            def log_message(self, format, *args) -> None:
+                return None
+
+        return Handler
+
+
+if __name__ == "__main__":
+    # usage: python replay_server.py record_dir port [latency] [jitter]
+    record_dir = Path(sys.argv[1])
+    port = int(sys.argv[2])
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    jitter = float(sys.argv[4]) if len(sys.argv) > 4 else 0.0
+
+    replay = ReplayServer(record_dir, port, latency, jitter)
+    print(f"replaying {record_dir} on {replay.url}")
+    replay.server.serve_forever()
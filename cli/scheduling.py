@@ -1,13 +1,78 @@
-import sched
-import time
 from datetime import datetime, timedelta
 from typing import Callable
 
+from keiba.base import Base
+
+
+class FixedPolicy:
+    """Schedule policy, job start 8 hours before to start race,
+    and its interval is 5m.(97 times per race)
+    """
+
+    def offsets(self) -> list:
+        """Generate offsets(timedelta before race time), far to near."""
+        offsets = [timedelta(minutes=i) for i in reversed(range(0, 485, 5))]
+
+        return offsets
+
+
+class AdaptivePolicy:
+    """Schedule policy, sparse far from race time and dense near race time.
+    Early snapshots barely change, while odds move most just before the off.
+
+    Parameters
+    ----------
+    steps: tuple
+        (minutes before race time, interval seconds) from far to near.
+        Each interval is used until next step's minutes.
+
+    max_requests: int
+        Cap of total jobs per race.
+        If offsets exceed it, drop far ones first.
+
+
+    Ex: default steps, race start at: 10:10
+    ---------------------------------------
+        2:10 ~ 8:10 every 30m
+        8:10 ~ 9:40 every 10m
+        9:40 ~ 10:00 every 2m
+        10:00 ~ 10:10 every 30s (race time included)
+    """
+
+    STEPS = ((480, 1800), (120, 600), (30, 120), (10, 30))
+
+    def __init__(self, steps: tuple = STEPS, max_requests: int = 97) -> None:
+        self.steps = steps
+        self.max_requests = max_requests
+
+        return None
+
+    def offsets(self) -> list:
+        """Generate offsets(timedelta before race time), far to near."""
+        seconds_list = []
+
+        bounds = [minutes * 60 for minutes, _ in self.steps[1:]] + [0]
+        for (minutes, interval), bound in zip(self.steps, bounds):
+            seconds_list.extend(range(minutes * 60, bound, -interval))
+        seconds_list.append(0)
+
+        offsets = [timedelta(seconds=s) for s in seconds_list]
+
+        return offsets[-self.max_requests:]
+
+
+POLICIES = {
+    "fixed": FixedPolicy,
+    "adaptive": AdaptivePolicy,
+}
+
 
 class Scheduling:
     """Scheduling job(get odds data) into scheduler instance.
-    Scheduling job start 8 hours before to start race, and its interval is 5m.
+    Scheduler is TickScheduler.
+    Job times are decided by schedule policy(Base.SCHEDULE_POLICY).
 
+    FixedPolicy: job start 8 hours before to start race, and its interval is 5m.
 
     Ex: Race start at: 10:10
     ------------------------
@@ -21,14 +86,20 @@ class Scheduling:
         95- 10:05
         97- 10:10 (race time)
 
+    AdaptivePolicy: see AdaptivePolicy docstring.
     """
 
     def __init__(
-        self, race_time: str, scheduler: sched.scheduler, job: Callable
+        self,
+        race_time: str,
+        scheduler,
+        job: Callable,
+        policy=None,
     ) -> None:
         self.race_time = race_time
         self.scheduler = scheduler
         self.job = job
+        self.policy = policy or POLICIES[Base.SCHEDULE_POLICY]()
 
         return None
 
@@ -39,30 +110,38 @@ class Scheduling:
         race_time_d = datetime.strptime(self.race_time, format_)
 
         times = []
-        for i in reversed(range(0, 485, 5)):
-            times.append(race_time_d - timedelta(minutes=i))
+        for offset in self.policy.offsets():
+            times.append(race_time_d - offset)
 
         return times
 
-    def setup_scheduler(self) -> None:
+    def setup_tick_scheduler(
+        self, item, after: float = None, completed: set = frozenset()
+    ) -> list:
+        """Add job with item into TickScheduler(self.scheduler) at each time.
 
-        for time_ in self.times:
-            delay_time = self._calc_delay_time(time_)
-            self._set_scheduler(self.scheduler, delay_time, self.job)
-
-        return None
+        Parameters
+        ----------
+        after: float
+            If given(unix time), times until this are not added.(ex. on restart)
 
-    def _calc_delay_time(self, start_time: datetime) -> datetime:
-        """Calc delay time to execute job."""
-        delay_time = start_time.timestamp() - time.time()
+        completed: set
+            Times(unix time) already done, not added.
 
-        return delay_time
+        Returns
+        -------
+        list
+            Times not added because they were until after and not completed.
+        """
+        missed = []
 
-    def _set_scheduler(
-        self, scheduler: sched.scheduler, delay_time: datetime, job: Callable
-    ) -> None:
-        """Set scheduling event into sched.scheduler."""
-        priority_ = 1
-        scheduler.enter(delay_time, priority_, job)
-
-        return None
+        for time_ in self.times:
+            due_time = time_.timestamp()
+            if due_time in completed:
+                continue
+            elif (after is not None) and (due_time <= after):
+                missed.append(time_)
+            else:
+                self.scheduler.add_job(time_, self.job, item)
+
+        return missed
@@ -0,0 +1,76 @@
+import sys
+import tempfile
+import time
+from datetime import datetime
+from itertools import groupby
+from pathlib import Path
+
+from keiba.base import Base
+from keiba.utils.date_utils import yyyymmdd_to_jra_date
+from keiba.utils.odds_utils import read_odds_series
+from keiba.utils.storage_utils import ParquetOddsWriter, read_parquet_day
+
+
+def convert_day(day_path: Path, out_path: Path) -> None:
+    """Convert race_{num}.csv files of 1 day into parquet files(out_path)."""
+    for csv_path in day_path.glob("*/race_*.csv"):
+        kaisai_path = out_path / csv_path.parent.name
+        kaisai_path.mkdir(parents=True, exist_ok=True)
+
+        race_num = csv_path.stem.split("_")[1]
+        writer = ParquetOddsWriter(kaisai_path, race_num, flush_snapshots=10**9)
+
+        odds_series = read_odds_series(csv_path)
+        for time_, rows in groupby(odds_series, key=lambda row: row["time"]):
+            time_d = datetime.fromisoformat(time_)
+            writer.write([{**row, "time": time_d} for row in rows])
+
+        writer.flush()
+
+    return None
+
+
+def load_csv_day(day_path: Path) -> int:
+    """Load all csv odds of 1 day, parse odds and time. Return row count."""
+    rows = 0
+    for csv_path in day_path.glob("*/race_*.csv"):
+        for row in read_odds_series(csv_path):
+            try:
+                float(row["odds"])
+            except ValueError:
+                pass
+            datetime.fromisoformat(row["time"])
+            rows += 1
+
+    return rows
+
+
+def total_size(day_path: Path, pattern: str) -> int:
+    return sum(f.stat().st_size for f in day_path.glob(pattern))
+
+
+if __name__ == "__main__":
+    # usage: python storage_bench.py yyyymmdd
+    # compare stored csv files with parquet files converted from them
+    day_path = Base.BASE_PATH / yyyymmdd_to_jra_date(sys.argv[1])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        out_path = Path(tmp_dir)
+        convert_day(day_path, out_path)
+
+        start_ = time.perf_counter()
+        csv_rows = load_csv_day(day_path)
+        csv_sec = time.perf_counter() - start_
+
+        start_ = time.perf_counter()
+        table = read_parquet_day(out_path)
+        parquet_sec = time.perf_counter() - start_
+
+        csv_size = total_size(day_path, "*/race_*.csv")
+        parquet_size = total_size(out_path, "*/race_*.parquet")
+
+    print(f"csv: {csv_size / 1024:.0f} KiB, {csv_rows} rows, {csv_sec:.3f} s")
+    print(
+        f"parquet: {parquet_size / 1024:.0f} KiB, {len(table)} rows, "
+        f"{parquet_sec:.3f} s"
+    )
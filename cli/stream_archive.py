@@ -0,0 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from keiba.base import Base
+from keiba.utils.archive_utils import ArchiveUploader
+from keiba.utils.date_utils import yyyymmdd_to_jra_date
+
+
+class StreamArchive(Base):
+    """Upload each race's odds files to s3 soon after race time, during race day.
+    Upload time is race time(day manifest) + STREAM_ARCHIVE_DELAY minutes.
+
+    Object keys are the same as FileArchive's,
+    so FileArchive at the end skips files already uploaded(same content)
+    and only uploads what's left.
+
+    Uploads run in its own thread, not in TickScheduler's batch,
+    so slow s3 never delays odds ticks due at the same time.
+    Call close to wait for pending uploads.
+
+    Parameters
+    ----------
+    yyyymmdd: str
+        Target date to execute.
+    """
+
+    def __init__(self, yyyymmdd: str) -> None:
+        super().__init__()
+        self.yyyymmdd = yyyymmdd
+        self.kaisai_date = yyyymmdd_to_jra_date(yyyymmdd)
+        self.uploader = ArchiveUploader(
+            self.ARCHIVE_BUCKET,
+            self.ARCHIVE_MAX_WORKERS,
+            compression=self.ARCHIVE_COMPRESSION,
+            endpoint_url=self.ARCHIVE_ENDPOINT_URL,
+            multipart_threshold=self.ARCHIVE_MULTIPART_THRESHOLD,
+            multipart_chunksize=self.ARCHIVE_MULTIPART_CHUNKSIZE,
+        )
+
+        # key: kaisai name, value: KaisaiOdds
+        self.kaisai_odds = {}
+        # 1 upload at a time, files of each upload are sent concurrently by uploader
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+        return None
+
+    def setup_tick_scheduler(self, scheduler, kaisai_odds, race_times: dict) -> None:
+        """Add upload job of each race into TickScheduler.
+
+        Parameters
+        ----------
+        kaisai_odds: KaisaiOdds
+            kaisai to upload. Its races are flushed before upload.
+
+        race_times: dict
+            key: race_num, value: start_time(yyyymmddhhmm) of races to upload.
+        """
+        format_ = "%Y%m%d%H%M"
+        self.kaisai_odds[kaisai_odds.kaisai_name] = kaisai_odds
+
+        for race_num, race_time in race_times.items():
+            race_time_d = datetime.strptime(race_time, format_)
+            time_ = race_time_d + timedelta(minutes=self.STREAM_ARCHIVE_DELAY)
+
+            scheduler.add_job(time_, self.job, (kaisai_odds.kaisai_name, race_num))
+
+        return None
+
+    def job(self, races: list) -> None:
+        """
+        Main job to execute by scheduler.
+        Flush odds files of races, and hand them to upload thread.
+
+        races: list
+            contains (kaisai_name, race_num) tuple.
+        """
+        files = []
+
+        for kaisai_name, race_num in races:
+            k = self.kaisai_odds[kaisai_name]
+            k.races[race_num].flush()
+
+            # race_{num}.csv, race_{num}_{seq}.parquet
+            for f in sorted(k.dir_path.glob(f"race_{race_num}[._]*")):
+                file_name = "/".join([self.yyyymmdd, kaisai_name, f.name])
+                files.append((f, file_name))
+
+        self.executor.submit(self._upload, races, files)
+
+        return None
+
+    def _upload(self, races: list, files: list) -> None:
+        try:
+            summary = self.uploader.upload_files(files)
+        except Exception as exc:
+            print(f"stream upload {races} failed: {exc!r}")
+        else:
+            print(f"stream upload {races}: {summary}")
+
+        return None
+
+    def close(self) -> None:
+        """Wait for pending uploads."""
+        self.executor.shutdown(wait=True)
+
+        return None
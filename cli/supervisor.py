@@ -0,0 +1,186 @@
+import multiprocessing as mp
+import signal
+import sys
+import time
+from pathlib import Path
+
+from keiba.base import Base
+from keiba.utils.date_utils import yyyymmdd_to_jra_date
+from keiba.utils.manifest_utils import DayManifest
+
+from exe_job import check_timezone, collect_odds
+from stream_archive import StreamArchive
+
+
+def shard_kaisai(kaisai_names: list, workers: int) -> list:
+    """Split kaisai names into shards, round robin.
+
+    Examples
+    --------
+        shard_kaisai(['1回中山1日', '1回中京1日', '1回小倉1日'], 2)
+        -> [['1回中山1日', '1回小倉1日'], ['1回中京1日']]
+    """
+    shards = [kaisai_names[i::workers] for i in range(workers)]
+
+    return [shard for shard in shards if shard]
+
+
+def worker_main(
+    worker_id: int, yyyymmdd: str, kaisai_names: list, status: dict
+) -> None:
+    """Collection loop of 1 worker process, runs odds jobs of kaisai_names only.
+    Each tick's result is written into shared status.
+    """
+    check_timezone()
+
+    # on SIGTERM, exit through finally so buffered odds are flushed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+
+    def on_fire(log_: dict) -> None:
+        worker_status = status[worker_id]
+        worker_status["fired"] += int(not log_["skipped"])
+        worker_status["skipped"] += int(log_["skipped"])
+        worker_status["last_tick"] = log_["planned"]
+        worker_status["last_lag"] = round(log_["lag"], 3)
+        status[worker_id] = worker_status
+
+        return None
+
+    kaisai_date = yyyymmdd_to_jra_date(yyyymmdd)
+    archiver = StreamArchive(yyyymmdd) if Base.STREAM_ARCHIVE else None
+
+    # each worker serves its own kaisai on ODDS_API_PORT + worker_id,
+    # and exports its metrics on METRICS_PORT + worker_id
+    api_port = Base.ODDS_API_PORT + worker_id if Base.ODDS_API_PORT else 0
+    metrics_port = Base.METRICS_PORT + worker_id if Base.METRICS_PORT else 0
+    if Base.METRICS_JSON_PATH:
+        json_path = Path(Base.METRICS_JSON_PATH)
+        metrics_json_path = str(json_path.with_stem(f"{json_path.stem}_{worker_id}"))
+    else:
+        metrics_json_path = ""
+
+    collect_odds(
+        kaisai_date,
+        kaisai_names,
+        on_fire,
+        archiver,
+        api_port,
+        metrics_port=metrics_port,
+        metrics_json_path=metrics_json_path,
+    )
+
+    return None
+
+
+class Supervisor(Base):
+    """Shard race-day collection across worker processes, kaisai by kaisai.
+
+    Each worker runs its own collection loop(exe_job.collect_odds),
+    so one slow kaisai doesn't block the others, and more cores are used.
+    If a worker crashes, it is restarted with the same kaisai.
+    Its schedule is generated again from day manifest(manifest.json)
+    and tick checkpoint(ticks.jsonl), so only ticks not completed yet are run,
+    and races which missed ticks while it was down are collected once right away.
+    Output files are the same as exe_job.py.
+
+    Parameters
+    ----------
+    yyyymmdd: str
+        Target date to execute.
+
+    workers: int
+        Number of worker processes.
+    """
+
+    def __init__(self, yyyymmdd: str, workers: int) -> None:
+        super().__init__()
+        self.yyyymmdd = yyyymmdd
+        self.kaisai_date = yyyymmdd_to_jra_date(yyyymmdd)
+        self.dir_path = self.BASE_PATH / self.kaisai_date
+        self.workers = workers
+
+        return None
+
+    def execute(self) -> None:
+        kaisai_names = sorted(DayManifest.load(self.dir_path).kaisai_names)
+        shards = shard_kaisai(kaisai_names, self.workers)
+
+        with mp.Manager() as manager:
+            status = manager.dict()
+            procs = {}
+
+            for worker_id, shard in enumerate(shards):
+                status[worker_id] = {
+                    "kaisai": shard,
+                    "state": "running",
+                    "restarts": 0,
+                    "fired": 0,
+                    "skipped": 0,
+                    "last_tick": None,
+                    "last_lag": None,
+                }
+                procs[worker_id] = self._start_worker(worker_id, shard, status)
+
+            while procs:
+                time.sleep(self.SUPERVISOR_INTERVAL)
+
+                for worker_id, proc in list(procs.items()):
+                    if proc.is_alive():
+                        continue
+                    else:
+                        pass
+
+                    procs.pop(worker_id)
+                    worker_status = status[worker_id]
+
+                    if proc.exitcode == 0:
+                        worker_status["state"] = "done"
+                    elif worker_status["restarts"] < self.MAX_WORKER_RESTARTS:
+                        print(f"worker {worker_id} crashed({proc.exitcode}), restart")
+                        worker_status["state"] = "running"
+                        worker_status["restarts"] += 1
+                        procs[worker_id] = self._start_worker(
+                            worker_id, worker_status["kaisai"], status
+                        )
+                    else:
+                        worker_status["state"] = "failed"
+
+                    status[worker_id] = worker_status
+
+                self.print_status(status)
+
+        print("======All workers finished======")
+
+        return None
+
+    def _start_worker(self, worker_id: int, shard: list, status: dict):
+        proc = mp.Process(
+            target=worker_main,
+            args=(worker_id, self.yyyymmdd, shard, status),
+            name=f"odds-worker-{worker_id}",
+        )
+        proc.start()
+
+        return proc
+
+    @staticmethod
+    def print_status(status: dict) -> None:
+        for worker_id, worker_status in sorted(status.items()):
+            kaisai = ",".join(worker_status["kaisai"])
+            print(
+                f"worker {worker_id} [{worker_status['state']}] {kaisai} "
+                f"fired: {worker_status['fired']} "
+                f"skipped: {worker_status['skipped']} "
+                f"restarts: {worker_status['restarts']} "
+                f"last_lag: {worker_status['last_lag']}"
+            )
+
+        return None
+
+
+if __name__ == "__main__":
+    # usage: python supervisor.py yyyymmdd [workers]
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else mp.cpu_count()
+
+    supervisor = Supervisor(sys.argv[1], workers)
+    supervisor.execute()
@@ -0,0 +1,202 @@
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable
+
+from keiba.utils.metrics_utils import metrics
+
+
+class TickScheduler:
+    """Tick driven scheduler engine.
+
+    Jobs are grouped by due time(tick), and each tick's batch is dispatched
+    to a worker pool at once.
+    If engine is late and several ticks are already due,
+    they are coalesced into 1 batch instead of running one by one.
+    If even the newest due tick is later than max_lag, the batch is skipped.
+    Planned and actual fire time of every tick are recorded in fire_log.
+
+    Job is called with list of items added at the tick.
+    (ex. KaisaiOdds.job(race_nums))
+
+    Parameters
+    ----------
+    max_workers: int
+        Upper limit of jobs running at the same time.
+
+    max_lag: float
+        Seconds, skip batch later than this.
+
+    clock: Callable
+        Returns current unix time. Default time.time.
+
+    sleep: Callable
+        Sleeps given seconds. Default time.sleep.
+        Inject clock and sleep(ex. SimClock) to simulate a race day in seconds.
+
+    on_fire: Callable
+        Called with fire_log entry after each tick. (ex. to update status)
+
+    on_job_done: Callable
+        Called with (planned, job, items, result) after each job succeeded.
+        result is job's return value. (ex. to checkpoint completed ticks)
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        max_lag: float,
+        clock: Callable = time.time,
+        sleep: Callable = time.sleep,
+        on_fire: Callable = None,
+        on_job_done: Callable = None,
+    ) -> None:
+        self.max_workers = max_workers
+        self.max_lag = max_lag
+        self.clock = clock
+        self.sleep = sleep
+        self.on_fire = on_fire
+        self.on_job_done = on_job_done
+
+        # heap of due times(unix time)
+        self.due_times = []
+        # key: due time, value: {job: {item: None}}
+        self.ticks = {}
+        self.fire_log = []
+
+        return None
+
+    def add_job(self, time_: datetime, job: Callable, item) -> None:
+        """Add job with item at time_. Same job at the same time is called once."""
+        due_time = time_.timestamp()
+
+        if due_time not in self.ticks:
+            heapq.heappush(self.due_times, due_time)
+            self.ticks[due_time] = {}
+        else:
+            pass
+
+        self.ticks[due_time].setdefault(job, {})[item] = None
+
+        return None
+
+    def run(self) -> None:
+        """Run until all ticks are fired."""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while self.due_times:
+                wait_time = self.due_times[0] - self.clock()
+                if wait_time > 0:
+                    self.sleep(wait_time)
+                    continue
+                else:
+                    pass
+
+                planned, batch, coalesced = self._pop_due_batch()
+                actual = self.clock()
+                skipped = (actual - planned) > self.max_lag
+
+                if not skipped:
+                    self._dispatch(executor, batch, planned)
+                else:
+                    pass
+
+                log_ = {
+                    "planned": planned,
+                    "actual": actual,
+                    "lag": actual - planned,
+                    "coalesced": coalesced,
+                    "skipped": skipped,
+                }
+                self.fire_log.append(log_)
+                metrics.observe("tick_lag", log_["lag"])
+
+                if self.on_fire is not None:
+                    self.on_fire(log_)
+                else:
+                    pass
+
+        return None
+
+    def _pop_due_batch(self) -> tuple:
+        """Pop all due ticks, and merge their jobs into 1 batch.
+
+        Returns
+        -------
+        tuple
+            planned: newest due time of merged ticks
+            batch: {job: {item: None}}
+            coalesced: number of ticks merged into newest one
+        """
+        now_ = self.clock()
+        batch = {}
+        due_count = 0
+
+        while self.due_times and self.due_times[0] <= now_:
+            planned = heapq.heappop(self.due_times)
+            due_count += 1
+
+            for job, items in self.ticks.pop(planned).items():
+                batch.setdefault(job, {}).update(items)
+
+        return (planned, batch, due_count - 1)
+
+    def _dispatch(
+        self, executor: ThreadPoolExecutor, batch: dict, planned: float
+    ) -> None:
+        """Run batch in worker pool, and wait for all jobs.
+        Even if some job fails, the others are not stopped.
+        """
+        futures = [
+            (executor.submit(job, list(items)), job, items)
+            for job, items in batch.items()
+        ]
+
+        for future, job, items in futures:
+            exc = future.exception()
+            if exc is not None:
+                print(f"job failed: {exc!r}")
+            elif self.on_job_done is not None:
+                self.on_job_done(planned, job, list(items), future.result())
+            else:
+                pass
+
+        return None
+
+    @property
+    def stats(self) -> dict:
+        """Summary of fire_log."""
+        fired = [log_ for log_ in self.fire_log if not log_["skipped"]]
+        lags = [log_["lag"] for log_ in fired]
+
+        return {
+            "fired": len(fired),
+            "skipped": len(self.fire_log) - len(fired),
+            "coalesced": sum(log_["coalesced"] for log_ in self.fire_log),
+            "max_lag": max(lags, default=0.0),
+            "mean_lag": sum(lags) / len(lags) if lags else 0.0,
+        }
+
+
+class SimClock:
+    """Simulated clock for TickScheduler.
+    sleep advances time instead of waiting.
+
+    Parameters
+    ----------
+    start: float
+        Unix time to start.
+    """
+
+    def __init__(self, start: float) -> None:
+        self.now_ = start
+
+        return None
+
+    def time(self) -> float:
+        return self.now_
+
+    def sleep(self, seconds: float) -> None:
+        self.now_ += seconds
+
+        return None
@@ -0,0 +1,28 @@
+import importlib.util
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT_PATH = Path(__file__).resolve().parents[1]
+
+# cli scripts import each other as local modules
+sys.path.insert(0, str(ROOT_PATH / "cli"))
+
+# Base reads these when imported, odds are stored under temporary dir
+# and jra responses are not cached while testing
+os.environ["KEIBA_BASE_PATH"] = tempfile.mkdtemp(prefix="keiba-test-")
+os.environ["KEIBA_RESPONSE_CACHE_PATH"] = ""
+
+# modules import this repository as keiba package, whatever its checkout dir is named
+if "keiba" not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        "keiba",
+        ROOT_PATH / "__init__.py",
+        submodule_search_locations=[str(ROOT_PATH)],
+    )
+    keiba = importlib.util.module_from_spec(spec)
+    sys.modules["keiba"] = keiba
+    spec.loader.exec_module(keiba)
+else:
+    pass
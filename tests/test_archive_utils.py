@@ -0,0 +1,50 @@
+import gzip
+
+import boto3
+import pytest
+
+from keiba.utils.archive_utils import ArchiveUploader
+
+moto = pytest.importorskip("moto")
+
+BUCKET = "keiba-archive"
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    """Bucket on moto's in-memory s3."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+
+    with moto.mock_aws():
+        client = boto3.client("s3")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def test_upload_files_compresses_and_skips_uploaded(s3, tmp_path):
+    files = []
+    for race_num in ("1", "2"):
+        file_path = tmp_path / f"race_{race_num}.csv"
+        file_path.write_text(f"name,odds,time\n馬{race_num},7.7,2022-01-05 10:00:00\n")
+        files.append((file_path, f"20220105/1回中山1日/{file_path.name}"))
+
+    uploader = ArchiveUploader(BUCKET, 2, compression="gzip")
+    summary = uploader.upload_files(files)
+    assert (summary["uploaded"], summary["skipped"]) == (2, 0)
+
+    r = s3.get_object(Bucket=BUCKET, Key="20220105/1回中山1日/race_1.csv.gz")
+    assert gzip.decompress(r["Body"].read()) == files[0][0].read_bytes()
+    assert r["Metadata"]["sha256"]
+
+    # 2nd run(ex. rerun of post process), only changed file is uploaded
+    files[1][0].write_text("name,odds,time\n")
+    summary = ArchiveUploader(BUCKET, 2, compression="gzip").upload_files(files)
+    assert (summary["uploaded"], summary["skipped"]) == (1, 1)
+
+    keys = [obj["Key"] for obj in s3.list_objects_v2(Bucket=BUCKET)["Contents"]]
+    assert sorted(keys) == [
+        "20220105/1回中山1日/race_1.csv.gz",
+        "20220105/1回中山1日/race_2.csv.gz",
+    ]
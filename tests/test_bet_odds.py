@@ -0,0 +1,56 @@
+import math
+
+from bet_odds import PlaceBet, QuinellaBet, TrifectaBet
+
+
+def combo_page(tables: dict) -> bytes:
+    """Combination odds page, key: caption, value: list of (last, odds)."""
+    html = "".join(
+        f"<table><caption>{caption}</caption><tbody>"
+        + "".join(f"<tr><th>{last}</th><td>{odds}</td></tr>" for last, odds in rows)
+        + "</tbody></table>"
+        for caption, rows in tables.items()
+    )
+
+    return f"<html><body>{html}</body></html>".encode("shift-jis")
+
+
+def test_place_bet_parses_odds_range():
+    rows = "".join(
+        f'<tr><td class="num">{i}</td><td class="horse">馬{i}</td>'
+        f'<td class="odds_tan">{i}.0</td><td class="odds_fuku">1.{i}-2.{i}</td></tr>'
+        for i in (1, 2)
+    )
+    content = f'<table id="odds_list"><tbody>{rows}</tbody></table>'.encode(
+        "shift-jis"
+    )
+
+    odds = PlaceBet.parse(content)
+    low, high = odds.get((1,))
+    assert math.isclose(low, 1.1, rel_tol=1e-6)
+    assert math.isclose(high, 2.1, rel_tol=1e-6)
+    assert [combo for combo, _ in odds.items()] == [(1,), (2,)]
+
+
+def test_place_bet_without_odds_list_is_empty():
+    odds = PlaceBet.parse(b"<html><body></body></html>")
+    assert odds.items() == []
+
+
+def test_trifecta_bet_parses_caption_tables():
+    content = combo_page(
+        {"1-2": [(3, "123.4"), (4, "取消")], "2-1": [(3, "98.7")], "1": [(2, "5.0")]}
+    )
+
+    odds = TrifectaBet.parse(content)
+    assert math.isclose(odds.get((1, 2, 3)), 123.4, rel_tol=1e-6)
+    assert math.isclose(odds.get((2, 1, 3)), 98.7, rel_tol=1e-6)
+    # not number, and caption of other bet type are NaN
+    assert math.isnan(odds.get((1, 2, 4)))
+    assert len(odds.items()) == 2
+
+
+def test_quinella_bet_is_unordered():
+    odds = QuinellaBet.parse(combo_page({"1": [(2, "5.0"), (3, "7.5")]}))
+    assert odds.get((2, 1)) == 5.0
+    assert odds.get((3, 1)) == 7.5
@@ -0,0 +1,58 @@
+from keiba.utils.checkpoint_utils import CheckpointQueue, TickCheckpoint
+
+
+def test_checkpoint_queue_resumes_pending_tasks(tmp_path):
+    file_path = tmp_path / "queue.jsonl"
+
+    queue = CheckpointQueue(file_path)
+    queue.put("month", "M1")
+    queue.put("kaisai", "K1", {"kaisai": "1回中山1日"})
+    queue.done(queue.get()["param"])
+    queue.close()
+
+    queue = CheckpointQueue(file_path)
+    assert not queue.put("kaisai", "K1")
+    assert queue.get()["param"] == "M1"
+    assert queue.get() is None
+    queue.close()
+
+
+def test_checkpoint_queue_drops_truncated_line(tmp_path):
+    file_path = tmp_path / "queue.jsonl"
+
+    queue = CheckpointQueue(file_path)
+    queue.put("month", "M1")
+    queue.close()
+
+    # crash while writing a record
+    with file_path.open(mode="a") as f:
+        f.write('{"op": "put", "kind": "kaisai", "par')
+
+    queue = CheckpointQueue(file_path)
+    queue.put("kaisai", "K2")
+    queue.close()
+
+    queue = CheckpointQueue(file_path)
+    assert {task["param"] for task in queue.pending} == {"M1", "K2"}
+    queue.close()
+
+
+def test_tick_checkpoint_drops_truncated_line(tmp_path):
+    file_path = tmp_path / "ticks.jsonl"
+
+    checkpoint = TickCheckpoint(file_path)
+    checkpoint.done("1回中山1日", ["1", "2"], 100.0)
+    checkpoint.close()
+
+    # crash while writing a record
+    with file_path.open(mode="a") as f:
+        f.write('{"kaisai": "1回中山1日", "races": ["1"')
+
+    checkpoint = TickCheckpoint(file_path)
+    checkpoint.done("1回中山1日", ["1"], 200.0)
+    checkpoint.close()
+
+    checkpoint = TickCheckpoint(file_path)
+    assert checkpoint.ticks("1回中山1日", "1") == {100.0, 200.0}
+    assert checkpoint.ticks("1回中山1日", "2") == {100.0}
+    assert checkpoint.ticks("1回中山1日", "3") == set()
@@ -0,0 +1,28 @@
+import json
+import os
+
+from keiba.utils.file_utils import json_cache_stats, read_json_cached
+
+
+def test_read_json_cached_hits_until_file_changes(tmp_path):
+    file_path = tmp_path / "manifest.json"
+    file_path.write_text(json.dumps({"kaisai": {"1": {"time": "202601051000"}}}))
+
+    before = json_cache_stats()
+    first = read_json_cached(file_path)
+    second = read_json_cached(file_path)
+    after = json_cache_stats()
+
+    assert first == second
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+    # callers may update nested dicts, cached value is not changed
+    first["kaisai"]["1"]["odds"] = "O_1"
+    assert "odds" not in read_json_cached(file_path)["kaisai"]["1"]
+
+    file_path.write_text(json.dumps({"kaisai": {"1": {"time": "202601051010"}}}))
+    stat_ = file_path.stat()
+    os.utime(file_path, ns=(stat_.st_atime_ns, stat_.st_mtime_ns + 1_000_000))
+
+    assert read_json_cached(file_path)["kaisai"]["1"]["time"] == "202601051010"
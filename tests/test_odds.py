@@ -0,0 +1,87 @@
+from functools import partialmethod
+
+import pytest
+
+from keiba.base import Base
+
+from odds import KaisaiOdds, Odds
+
+KAISAI_NAME = "1回中山1日"
+
+
+def odds_page(race_num: str) -> bytes:
+    """Minimal win odds page of race_num, 2 horses."""
+    rows = "".join(
+        f'<tr><td class="num">{i}</td><td class="horse">馬{race_num}{i}</td>'
+        f'<td class="odds_tan">{race_num}.{i}</td>'
+        f'<td class="odds_fuku">1.{i}-2.{i}</td></tr>'
+        for i in (1, 2)
+    )
+    html = f'<table id="odds_list"><tbody>{rows}</tbody></table>'
+
+    return f"<html><body>{html}</body></html>".encode("shift-jis")
+
+
+@pytest.fixture(autouse=True)
+def place_odds(monkeypatch):
+    """Collect place odds too.(not collected by default)"""
+    monkeypatch.setattr(
+        Base, "__init__", partialmethod(Base.__init__, ODDS_BET_TYPES=("place",))
+    )
+
+
+def make_kaisai_dir(tmp_path):
+    # BASE_PATH is temporary dir(see conftest.py), kaisai_date is unique per test
+    kaisai_date = tmp_path.name
+    dir_path = Base.BASE_PATH / kaisai_date / KAISAI_NAME
+    dir_path.mkdir(parents=True)
+    for race_num in ("1", "2", "3"):
+        (dir_path / f"race_{race_num}.csv").write_text("name,odds,time\n")
+
+    return kaisai_date, dir_path
+
+
+def test_kaisai_odds_job_keeps_writing_when_fallback_fails(tmp_path, monkeypatch):
+    kaisai_date, dir_path = make_kaisai_dir(tmp_path)
+
+    def fetch_odds_content(self, odds_param):
+        # fall back fails too
+        if self.race_num == "2":
+            raise ConnectionError("odds page")
+        else:
+            return odds_page(self.race_num)
+
+    monkeypatch.setattr(Odds, "_fetch_odds_content", fetch_odds_content)
+
+    k = KaisaiOdds(kaisai_date, KAISAI_NAME, {"1": "O_1", "2": "O_2", "3": "O_3"})
+    assert k.job(["1", "2", "3"]) == ["1", "3"]
+    k.flush()
+
+    assert len((dir_path / "race_1.csv").read_text().splitlines()) == 3
+    assert len((dir_path / "race_2.csv").read_text().splitlines()) == 1
+    assert len((dir_path / "race_3.csv").read_text().splitlines()) == 3
+    assert (dir_path / "race_1_place.bin").exists()
+    assert (dir_path / "race_3_place.bin").exists()
+    assert not (dir_path / "race_2_place.bin").exists()
+
+
+def test_kaisai_odds_job_parses_place_from_fallback_page(tmp_path, monkeypatch):
+    kaisai_date, dir_path = make_kaisai_dir(tmp_path)
+    fetched = []
+
+    def fetch_odds_content(self, odds_param):
+        # 1st fetch of race 2 fails, and its fall back succeeds
+        fetched.append(self.race_num)
+        if fetched.count("2") == 1 and self.race_num == "2":
+            raise ConnectionError("odds page")
+        else:
+            return odds_page(self.race_num)
+
+    monkeypatch.setattr(Odds, "_fetch_odds_content", fetch_odds_content)
+
+    k = KaisaiOdds(kaisai_date, KAISAI_NAME, {"1": "O_1", "2": "O_2", "3": "O_3"})
+    assert k.job(["1", "2", "3"]) == ["1", "2", "3"]
+    k.flush()
+
+    assert len((dir_path / "race_2.csv").read_text().splitlines()) == 3
+    assert (dir_path / "race_2_place.bin").exists()
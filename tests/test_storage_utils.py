@@ -0,0 +1,76 @@
+import math
+from array import array
+from datetime import datetime, timedelta
+
+from keiba.utils.storage_utils import (
+    ComboOddsWriter,
+    CsvOddsWriter,
+    read_combo_odds,
+)
+
+TIME_ = datetime(2022, 1, 5, 10, 0, 0)
+SECOND = timedelta(seconds=1)
+# unix time(milliseconds) of TIME_
+TIME_MS = int(TIME_.timestamp() * 1000)
+
+
+def snapshot(odds: str, second: int) -> list:
+    time_ = datetime(2022, 1, 5, 10, 0, second)
+    return [{"name": "ダイバナナダイスキ", "odds": odds, "time": time_}]
+
+
+def test_csv_odds_writer_counts_flushed_snapshots(tmp_path):
+    writer = CsvOddsWriter(tmp_path, "1", flush_rows=2, flush_interval=60.0)
+    writer.write(snapshot("7.7", 0))
+    assert (writer.write_count, writer.flushed_count) == (1, 0)
+
+    writer.write(snapshot("7.8", 1))
+    assert (writer.write_count, writer.flushed_count) == (2, 2)
+
+    # snapshot not newer than the last one is not written
+    writer.write(snapshot("7.9", 1))
+    writer.write(snapshot("8.0", 2))
+    assert (writer.write_count, writer.flushed_count) == (3, 2)
+
+    writer.close()
+    assert writer.flushed_count == 3
+    assert len((tmp_path / "race_1.csv").read_text().splitlines()) == 3
+
+
+def test_combo_odds_writer_round_trip(tmp_path):
+    file_path = tmp_path / "race_1_trifecta.bin"
+    writer = ComboOddsWriter(tmp_path, "1", "trifecta", 4)
+    writer.write(array("f", [1.5, math.nan, 2.5, math.nan]), TIME_)
+    # only index 0 changes
+    writer.write(array("f", [1.75, math.nan, 2.5, math.nan]), TIME_ + SECOND)
+    writer.close()
+
+    series = read_combo_odds(file_path, 4)
+    assert [time_ for time_, _ in series] == [TIME_MS, TIME_MS + 1000]
+    assert list(series[1][1])[0::2] == [1.75, 2.5]
+    assert math.isnan(series[1][1][1])
+    # header(12 bytes) + 2 changed cells, and header + 1 changed cell
+    assert file_path.stat().st_size == (12 + 2 * 6) + (12 + 1 * 6)
+
+
+def test_combo_odds_writer_drops_truncated_record(tmp_path):
+    file_path = tmp_path / "race_1_trifecta.bin"
+    writer = ComboOddsWriter(tmp_path, "1", "trifecta", 4)
+    writer.write(array("f", [1.5, math.nan, 2.5, math.nan]), TIME_)
+    writer.write(array("f", [1.75, math.nan, 2.5, math.nan]), TIME_ + SECOND)
+    writer.close()
+
+    # crash while writing 2nd record
+    data = file_path.read_bytes()
+    file_path.write_bytes(data[:-3])
+    assert len(read_combo_odds(file_path, 4)) == 1
+
+    # restored from 1st record, so index 0 is written as changed again
+    writer = ComboOddsWriter(tmp_path, "1", "trifecta", 4)
+    writer.write(array("f", [1.75, math.nan, 2.5, math.nan]), TIME_ + 2 * SECOND)
+    writer.close()
+
+    series = read_combo_odds(file_path, 4)
+    assert len(series) == 2
+    assert series[1][0] == TIME_MS + 2000
+    assert list(series[1][1])[0::2] == [1.75, 2.5]
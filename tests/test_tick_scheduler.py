@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+
+from tick_scheduler import SimClock, TickScheduler
+
+START = datetime(2022, 1, 5, 10, 0, 0)
+MINUTE = timedelta(minutes=1)
+
+
+def make_scheduler(max_lag: float = 30.0, **kwargs) -> tuple:
+    clock = SimClock(START.timestamp() - 10)
+    s = TickScheduler(2, max_lag, clock=clock.time, sleep=clock.sleep, **kwargs)
+
+    return s, clock
+
+
+def test_waits_until_each_tick_and_records_fire_log():
+    called = []
+    s, _ = make_scheduler()
+    s.add_job(START, called.append, "1")
+    s.add_job(START, called.append, "2")
+    s.add_job(START + MINUTE, called.append, "1")
+    s.run()
+
+    # items added at the same tick are passed to 1 job call
+    assert called == [["1", "2"], ["1"]]
+    assert [log_["planned"] for log_ in s.fire_log] == [
+        START.timestamp(),
+        (START + MINUTE).timestamp(),
+    ]
+    assert [log_["actual"] for log_ in s.fire_log] == [
+        log_["planned"] for log_ in s.fire_log
+    ]
+    assert s.stats["fired"] == 2
+    assert s.stats["max_lag"] == 0.0
+
+
+def test_due_ticks_are_coalesced_into_newest_one():
+    called = []
+    s, clock = make_scheduler(max_lag=60.0)
+
+    def slow_job(items):
+        # the next 2 ticks are due when this returns
+        called.append(items)
+        clock.sleep(150)
+
+    s.add_job(START, slow_job, "1")
+    s.add_job(START + MINUTE, called.append, "1")
+    s.add_job(START + 2 * MINUTE, called.append, "2")
+    s.run()
+
+    assert called == [["1"], ["1", "2"]]
+    log_ = s.fire_log[1]
+    assert log_["planned"] == (START + 2 * MINUTE).timestamp()
+    assert log_["actual"] == START.timestamp() + 150
+    assert log_["lag"] == 30
+    assert log_["coalesced"] == 1
+    assert s.stats["coalesced"] == 1
+
+
+def test_tick_later_than_max_lag_is_skipped():
+    called = []
+    s, clock = make_scheduler(max_lag=30.0)
+
+    def slow_job(items):
+        called.append(items)
+        clock.sleep(100)
+
+    s.add_job(START, slow_job, "1")
+    s.add_job(START + MINUTE, called.append, "2")
+    s.add_job(START + 3 * MINUTE, called.append, "3")
+    s.run()
+
+    # tick of "2" is 40 seconds late
+    assert called == [["1"], ["3"]]
+    assert [log_["skipped"] for log_ in s.fire_log] == [False, True, False]
+    assert s.stats["skipped"] == 1
+    assert s.stats["fired"] == 2
+
+
+def test_failed_job_does_not_stop_others():
+    done = []
+
+    def failing_job(items):
+        raise ConnectionError("odds page")
+
+    def job(items):
+        return items[::-1]
+
+    s, _ = make_scheduler(
+        on_job_done=lambda planned, job, items, result: done.append((items, result))
+    )
+    s.add_job(START, failing_job, "1")
+    s.add_job(START, job, "2")
+    s.add_job(START, job, "3")
+    s.add_job(START + MINUTE, failing_job, "1")
+    s.add_job(START + MINUTE, job, "2")
+    s.run()
+
+    # on_job_done is called for succeeded jobs only, with their results
+    assert done == [(["2", "3"], ["3", "2"]), (["2"], ["2"])]
+    assert s.stats["fired"] == 2
@@ -0,0 +1,173 @@
+import gzip
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import ClientError
+
+# key: compression name, value: suffix added to object key
+COMPRESSION_SUFFIXES = {
+    "": "",
+    "gzip": ".gz",
+    "zstd": ".zst",
+}
+
+
+def compress_bytes(data: bytes, compression: str) -> bytes:
+    """Compress data by compression('', 'gzip' or 'zstd').
+    zstd needs zstandard package.
+    """
+    if compression == "":
+        return data
+    elif compression == "gzip":
+        return gzip.compress(data)
+    elif compression == "zstd":
+        import zstandard
+
+        return zstandard.ZstdCompressor().compress(data)
+    else:
+        raise ValueError(f"unknown compression: {compression}")
+
+
+class ArchiveUploader:
+    """Upload files to s3 bucket concurrently.
+
+    Each object has sha256 of original content in its metadata,
+    and files whose hash already matches the object are skipped.
+
+    Parameters
+    ----------
+    bucket_name: str
+        Target s3 bucket.
+
+    max_workers: int
+        Number of files uploaded at the same time.
+
+    compression: str
+        '', 'gzip' or 'zstd'. Compressed object's key has suffix(.gz, .zst).
+
+    endpoint_url: str
+        s3 endpoint. Use for local s3 stand-in. ('' is aws default)
+
+    multipart_threshold: int
+        Bytes, files larger than this are uploaded by multipart.
+
+    multipart_chunksize: int
+        Bytes of each multipart chunk.
+    """
+
+    def __init__(
+        self,
+        bucket_name: str,
+        max_workers: int,
+        compression: str = "",
+        endpoint_url: str = "",
+        multipart_threshold: int = 8 * 1024 * 1024,
+        multipart_chunksize: int = 8 * 1024 * 1024,
+    ) -> None:
+        self.bucket_name = bucket_name
+        self.max_workers = max_workers
+        self.compression = compression
+        self.suffix = COMPRESSION_SUFFIXES[compression]
+
+        # s3 client is thread safe, resource is not
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or None)
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+        )
+
+        self._lock = threading.Lock()
+        self.uploaded_count = 0
+        self.skipped_count = 0
+        self.uploaded_bytes = 0
+
+        return None
+
+    def upload_files(self, files: list) -> dict:
+        """Upload files concurrently, and return summary of this call.
+
+        Parameters
+        ----------
+        files: list
+            contains (file_path, key) tuple.
+
+        Returns
+        -------
+        dict
+            uploaded, skipped: number of files
+            bytes: uploaded bytes(after compression)
+            seconds: elapsed time
+            bytes_per_sec: uploaded bytes / seconds
+        """
+        start_ = time.perf_counter()
+        uploaded_count = self.uploaded_count
+        skipped_count = self.skipped_count
+        uploaded_bytes = self.uploaded_bytes
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [
+                executor.submit(self.upload_file, file_path, key)
+                for file_path, key in files
+            ]
+
+        for future in futures:
+            future.result()
+
+        seconds = time.perf_counter() - start_
+        uploaded_bytes = self.uploaded_bytes - uploaded_bytes
+
+        return {
+            "uploaded": self.uploaded_count - uploaded_count,
+            "skipped": self.skipped_count - skipped_count,
+            "bytes": uploaded_bytes,
+            "seconds": round(seconds, 3),
+            "bytes_per_sec": round(uploaded_bytes / seconds) if seconds else 0,
+        }
+
+    def upload_file(self, file_path: Path, key: str) -> bool:
+        """Upload 1 file, (compressed if set).
+        Return False if skipped because same content is already uploaded.
+        """
+        data = file_path.read_bytes()
+        sha256 = hashlib.sha256(data).hexdigest()
+        key = key + self.suffix
+
+        if self._remote_sha256(key) == sha256:
+            with self._lock:
+                self.skipped_count += 1
+            return False
+        else:
+            pass
+
+        body = compress_bytes(data, self.compression)
+        self.client.upload_fileobj(
+            BytesIO(body),
+            self.bucket_name,
+            key,
+            ExtraArgs={"Metadata": {"sha256": sha256}},
+            Config=self.transfer_config,
+        )
+
+        with self._lock:
+            self.uploaded_count += 1
+            self.uploaded_bytes += len(body)
+
+        return True
+
+    def _remote_sha256(self, key: str) -> str:
+        """sha256 in metadata of uploaded object. None if not uploaded."""
+        try:
+            r = self.client.head_object(Bucket=self.bucket_name, Key=key)
+        except ClientError as exc:
+            if exc.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            else:
+                raise
+
+        return r["Metadata"].get("sha256")
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from keiba.base import Base
+
+
+class ResponseCache:
+    """On-disk cache of jra page responses, keyed by (url, cname).
+
+    Each entry is {sha1}.bin(raw content) and {sha1}.json(meta).
+    File mtime is stored time, and atime is last access time(set on hit)
+    used for LRU eviction when total size exceeds max_bytes.
+
+    Parameters
+    ----------
+    cache_dir: Path
+        dir to store entries.
+
+    max_bytes: int
+        Upper bound of total content bytes.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int) -> None:
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.total_bytes = sum(f.stat().st_size for f in cache_dir.glob("*.bin"))
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "evictions": 0}
+
+        return None
+
+    def _path(self, url: str, cname: str) -> Path:
+        key_ = hashlib.sha1(f"{url}\n{cname}".encode("utf-8")).hexdigest()
+
+        return self.cache_dir / f"{key_}.bin"
+
+    def get(self, url: str, cname: str) -> tuple:
+        """Return (content, meta, age seconds), or None if not cached."""
+        path = self._path(url, cname)
+
+        try:
+            content = path.read_bytes()
+            meta = json.loads(path.with_suffix(".json").read_text())
+            mtime = path.stat().st_mtime
+        except (FileNotFoundError, ValueError):
+            return None
+
+        return (content, meta, time.time() - mtime)
+
+    def hit(self, url: str, cname: str) -> None:
+        """Count hit, and update last access time for LRU."""
+        path = self._path(url, cname)
+        try:
+            os.utime(path, (time.time(), path.stat().st_mtime))
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            self.stats["hits"] += 1
+
+        return None
+
+    def miss(self) -> None:
+        with self._lock:
+            self.stats["misses"] += 1
+
+        return None
+
+    def revalidated(self, url: str, cname: str) -> None:
+        """Server answered 304, entry is fresh again."""
+        path = self._path(url, cname)
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            pass
+
+        with self._lock:
+            self.stats["revalidated"] += 1
+
+        return None
+
+    def put(self, url: str, cname: str, content: bytes, meta: dict) -> None:
+        path = self._path(url, cname)
+        old_size = path.stat().st_size if path.exists() else 0
+
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(content)
+        path.with_suffix(".json").write_text(json.dumps(meta))
+        tmp_path.replace(path)
+
+        with self._lock:
+            self.total_bytes += len(content) - old_size
+            over = self.total_bytes > self.max_bytes
+
+        if over:
+            self._evict()
+        else:
+            pass
+
+        return None
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until total size is under max_bytes."""
+        with self._lock:
+            entries = sorted(
+                (f.stat().st_atime, f.stat().st_size, f)
+                for f in self.cache_dir.glob("*.bin")
+            )
+
+            for _, size, f in entries:
+                if self.total_bytes <= self.max_bytes:
+                    break
+                else:
+                    pass
+
+                f.unlink(missing_ok=True)
+                f.with_suffix(".json").unlink(missing_ok=True)
+                self.total_bytes -= size
+                self.stats["evictions"] += 1
+
+        return None
+
+
+def page_ttl(cname: str, ttls: tuple) -> int:
+    """TTL seconds of page, by longest matched cname prefix.
+    0(never cached) if no prefix matches.
+
+    ttls: tuple
+        ((cname prefix, ttl seconds), ...)
+    """
+    matched = [
+        (len(prefix), ttl) for prefix, ttl in ttls if cname.startswith(prefix)
+    ]
+
+    return max(matched)[1] if matched else 0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return process-wide ResponseCache, created from Base settings.
+    None if cache is disabled(Base.RESPONSE_CACHE_PATH is '').
+    """
+    global _cache
+
+    if not Base.RESPONSE_CACHE_PATH:
+        return None
+    else:
+        pass
+
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                Path(Base.RESPONSE_CACHE_PATH), Base.RESPONSE_CACHE_MAX_BYTES
+            )
+        else:
+            pass
+
+    return _cache
+
+
+def response_cache_stats() -> dict:
+    """hits, misses, hit_rate etc. of process-wide response cache.
+    Empty if cache is disabled.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return {}
+    else:
+        pass
+
+    with cache._lock:
+        stats_ = dict(cache.stats)
+        stats_["bytes"] = cache.total_bytes
+
+    total = stats_["hits"] + stats_["revalidated"] + stats_["misses"]
+    hit_rate = (stats_["hits"] + stats_["revalidated"]) / total if total else 0.0
+    stats_["hit_rate"] = round(hit_rate, 3)
+
+    return stats_
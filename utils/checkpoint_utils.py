@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+from collections import deque
+from pathlib import Path
+
+
+def _truncate_partial_line(file_path: Path) -> None:
+    """Drop truncated last line(crash while writing) of json lines file,
+    so the next record appended is not glued onto it.
+    """
+    data = file_path.read_bytes()
+    if data and not data.endswith(b"\n"):
+        with file_path.open(mode="r+b") as f:
+            f.truncate(data.rfind(b"\n") + 1)
+    else:
+        pass
+
+    return None
+
+
+class CheckpointQueue:
+    """Work queue checkpointed to disk, to resume long crawl after crash or stop.
+
+    Every change is appended to file(json lines) and flushed:
+        {"op": "put", "kind": ..., "param": ..., "context": {...}}
+        {"op": "done", "param": ...}
+    On start, the file is replayed, and tasks put but not done are pending again.
+    Truncated last line(crash while writing) is dropped.
+    Tasks are deduplicated by param, so a page linked from many pages
+    is queued only once over all runs.
+
+    Pending tasks are taken newest first(depth first),
+    so results come out early and pending tasks stay few.
+
+    Parameters
+    ----------
+    file_path: Path
+        checkpoint file.(ex. queue.jsonl)
+    """
+
+    def __init__(self, file_path: Path) -> None:
+        self.file_path = file_path
+        self.file_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # key: param, value: task(dict)
+        self.tasks = {}
+        self.done_params = set()
+        self._lock = threading.Lock()
+
+        if file_path.exists():
+            _truncate_partial_line(file_path)
+            self._replay()
+        else:
+            pass
+
+        self.pending = deque(
+            task for param, task in self.tasks.items() if param not in self.done_params
+        )
+        self._file = file_path.open(mode="a")
+
+        return None
+
+    def _replay(self) -> None:
+        with self.file_path.open(mode="r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # truncated last line(crash while writing)
+                    continue
+
+                if record["op"] == "put":
+                    self.tasks.setdefault(record["param"], record)
+                elif record["op"] == "done":
+                    self.done_params.add(record["param"])
+                else:
+                    pass
+
+        return None
+
+    def _append(self, record: dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+        return None
+
+    def put(self, kind: str, param: str, context: dict = None) -> bool:
+        """Queue task. Returns False if param was already queued."""
+        with self._lock:
+            if param in self.tasks:
+                return False
+            else:
+                pass
+
+            task = {"op": "put", "kind": kind, "param": param, "context": context or {}}
+            self.tasks[param] = task
+            self.pending.append(task)
+            self._append(task)
+
+        return True
+
+    def get(self) -> dict:
+        """Pending task, None if empty."""
+        with self._lock:
+            return self.pending.pop() if self.pending else None
+
+    def retry(self, task: dict) -> None:
+        """Return task taken by get into pending, to run it again."""
+        with self._lock:
+            self.pending.appendleft(task)
+
+        return None
+
+    def done(self, param: str) -> None:
+        with self._lock:
+            self.done_params.add(param)
+            self._append({"op": "done", "param": param})
+
+        return None
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queued": len(self.tasks),
+                "done": len(self.done_params),
+                "pending": len(self.pending),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+        return None
+
+
+class TickCheckpoint:
+    """Completed ticks of each race, to resume odds collection after restart.
+
+    Each completed job is appended to file(json lines) and flushed:
+        {"kaisai": kaisai_name, "races": [race_num, ...], "tick": planned unix time}
+    Lines are written by 1 write call in append mode,
+    so worker processes of the same day can share the file.
+    Truncated last line(crash while writing) is dropped.
+
+    Parameters
+    ----------
+    file_path: Path
+        checkpoint file.(ex. BASE_PATH/kaisai_date/ticks.jsonl)
+    """
+
+    def __init__(self, file_path: Path) -> None:
+        self.file_path = file_path
+
+        # key: (kaisai_name, race_num), value: set of planned unix time
+        self.completed = {}
+        self._lock = threading.Lock()
+
+        if file_path.exists():
+            _truncate_partial_line(file_path)
+            self._replay()
+        else:
+            pass
+
+        self._file = None
+
+        return None
+
+    def _replay(self) -> None:
+        with self.file_path.open(mode="r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # truncated last line(crash while writing)
+                    continue
+
+                for race_num in record["races"]:
+                    key_ = (record["kaisai"], race_num)
+                    self.completed.setdefault(key_, set()).add(record["tick"])
+
+        return None
+
+    def ticks(self, kaisai_name: str, race_num: str) -> set:
+        """Completed ticks(planned unix time) of race."""
+        with self._lock:
+            return set(self.completed.get((kaisai_name, race_num), ()))
+
+    def done(self, kaisai_name: str, race_nums: list, tick: float) -> None:
+        record = {"kaisai": kaisai_name, "races": list(race_nums), "tick": tick}
+
+        with self._lock:
+            for race_num in race_nums:
+                self.completed.setdefault((kaisai_name, race_num), set()).add(tick)
+
+            if self._file is None:
+                self.file_path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = self.file_path.open(mode="a")
+            else:
+                pass
+
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+
+        return None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            else:
+                pass
+
+        return None
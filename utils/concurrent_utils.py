@@ -0,0 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable
+
+
+def concurrent_starmap(func: Callable, iterable: Iterable, max_workers: int) -> list:
+    """Concurrent version of itertools.starmap, in bounded thread pool.
+    Results are returned as list in the same order as iterable.
+    If max_workers is 1, run sequentially without thread pool.
+    """
+    args_list = list(iterable)
+
+    if max_workers <= 1:
+        return [func(*args) for args in args_list]
+    else:
+        pass
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(func, *args) for args in args_list]
+
+    return [future.result() for future in futures]
@@ -1,7 +1,15 @@
+import copy
 import csv
 import json
+import threading
 from pathlib import Path
 
+# process-wide cache of read_json_cached
+# key: file path, value: (mtime_ns, size, dict)
+_json_cache = {}
+_json_cache_lock = threading.Lock()
+_json_cache_stats = {"hits": 0, "misses": 0}
+
 
 def create_folders(dir_path, parents=True, exist_ok=True):
     """Create folders in target dir, defined as dir_path."""
@@ -34,21 +42,48 @@ def read_json(file_path: Path) -> dict:
     return dict_
 
 
-def generate_csv(file_path: Path, header_: list) -> None:
-    """Touch csv, and write header.
+def read_json_cached(file_path: Path) -> dict:
+    """read data from json file through process-wide cache.
+    Cache is invalidated when file's mtime or size changes.
+    For metadata files(manifest.json) loaded again by each stage in a process.
+    Callers get a deep copy, so they can update it(ex. DayManifest.set_race).
     """
-    with file_path.open(mode="w", newline="") as f:
-        writer_ = csv.DictWriter(f, fieldnames=header_)
-        writer_.writeheader()
+    stat_ = file_path.stat()
+    key_ = (stat_.st_mtime_ns, stat_.st_size)
 
-    return None
+    with _json_cache_lock:
+        cached = _json_cache.get(file_path)
+        if (cached is not None) and (cached[0] == key_):
+            _json_cache_stats["hits"] += 1
+            return copy.deepcopy(cached[1])
+        else:
+            _json_cache_stats["misses"] += 1
+
+    dict_ = read_json(file_path)
+
+    with _json_cache_lock:
+        _json_cache[file_path] = (key_, dict_)
 
+    return copy.deepcopy(dict_)
 
-def append_to_csv(file_path: Path, header_: list, data: list) -> None:
-    """Append data to the end of target csv file.
+
+def json_cache_stats() -> dict:
+    """hits, misses and hit_rate of read_json_cached."""
+    with _json_cache_lock:
+        hits = _json_cache_stats["hits"]
+        misses = _json_cache_stats["misses"]
+
+    total = hits + misses
+    hit_rate = round(hits / total, 3) if total else 0.0
+
+    return {"hits": hits, "misses": misses, "hit_rate": hit_rate}
+
+
+def generate_csv(file_path: Path, header_: list) -> None:
+    """Touch csv, and write header.
     """
-    with file_path.open(mode="a", newline="") as f:
+    with file_path.open(mode="w", newline="") as f:
         writer_ = csv.DictWriter(f, fieldnames=header_)
-        writer_.writerows(data)
+        writer_.writeheader()
 
     return None
@@ -0,0 +1,190 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from keiba.base import Base
+
+# upper bounds(seconds) of latency histogram buckets
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, float("inf"))
+
+
+class JraSession:
+    """Shared http session to request jra pages.
+
+    Keep-alive connections are pooled and reused by every request,
+    instead of opening new TCP+TLS connection per request.
+    Failed requests(5xx, connection error) are retried with backoff,
+    and requests to the same host are spaced by min_interval.
+
+    Parameters
+    ----------
+    timeout: float
+        Seconds to wait for connect and read.
+
+    retries: int
+        Max retry count of 1 request.
+
+    backoff_factor: float
+        Retry waits backoff_factor * (2 ** (retry count - 1)) seconds.
+
+    min_interval: float
+        Min seconds between requests to the same host.
+
+    pool_maxsize: int
+        Max connections kept in pool per host.
+    """
+
+    def __init__(
+        self,
+        timeout: float,
+        retries: int,
+        backoff_factor: float,
+        min_interval: float,
+        pool_maxsize: int,
+    ) -> None:
+        self.timeout = timeout
+        self.min_interval = min_interval
+
+        retry_ = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=None,
+        )
+        self.adapter = HTTPAdapter(pool_maxsize=pool_maxsize, max_retries=retry_)
+
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+        self._lock = threading.Lock()
+        self._next_request_time = {}
+
+        self.request_count = 0
+        self.retry_count = 0
+        self.latency_hist = [0] * len(LATENCY_BUCKETS)
+
+        return None
+
+    def post(self, url: str, data: dict, headers: dict = None) -> requests.Response:
+        """Post data to url through pooled connections.
+        headers: extra request headers(ex. If-None-Match for conditional request)
+        """
+        self._wait_rate_limit(urlparse(url).netloc)
+
+        start_ = time.perf_counter()
+        r = self.session.post(url=url, data=data, headers=headers, timeout=self.timeout)
+        latency = time.perf_counter() - start_
+
+        self._count(r, latency)
+
+        return r
+
+    def _wait_rate_limit(self, host: str) -> None:
+        """Sleep until min_interval has passed since last request to host."""
+        with self._lock:
+            now_ = time.monotonic()
+            request_time = max(now_, self._next_request_time.get(host, now_))
+            self._next_request_time[host] = request_time + self.min_interval
+
+        wait_time = request_time - now_
+        if wait_time > 0:
+            time.sleep(wait_time)
+        else:
+            pass
+
+        return None
+
+    def _count(self, r: requests.Response, latency: float) -> None:
+        retries_ = r.raw.retries
+        retry_num = len(retries_.history) if retries_ is not None else 0
+
+        with self._lock:
+            self.request_count += 1
+            self.retry_count += retry_num
+
+            for i, upper in enumerate(LATENCY_BUCKETS):
+                if latency <= upper:
+                    self.latency_hist[i] += 1
+                    break
+                else:
+                    pass
+
+        return None
+
+    @property
+    def connection_count(self) -> int:
+        """Number of connections opened by pool, over all hosts."""
+        pools = self.adapter.poolmanager.pools
+
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    @property
+    def stats(self) -> dict:
+        """Counters to see how much the pool saves.
+
+        Returns
+        -------
+        dict
+            key: "requests"
+            value: number of requests
+
+            key: "connections"
+            value: number of opened connections
+
+            key: "reuse_ratio"
+            value: ratio of requests which reused pooled connection
+
+            key: "retries"
+            value: number of retries
+
+            key: "latency"
+            value: dict, key: bucket upper bound(seconds), value: count
+        """
+        requests_ = self.request_count
+        connections = self.connection_count
+
+        if requests_ > 0:
+            reuse_ratio = max(requests_ - connections, 0) / requests_
+        else:
+            reuse_ratio = 0.0
+
+        latency = {
+            str(upper): count
+            for upper, count in zip(LATENCY_BUCKETS, self.latency_hist)
+        }
+
+        return {
+            "requests": requests_,
+            "connections": connections,
+            "reuse_ratio": round(reuse_ratio, 3),
+            "retries": self.retry_count,
+            "latency": latency,
+        }
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> JraSession:
+    """Return process-wide JraSession, created from Base settings."""
+    global _session
+
+    with _session_lock:
+        if _session is None:
+            _session = JraSession(
+                timeout=Base.REQUEST_TIMEOUT,
+                retries=Base.REQUEST_RETRIES,
+                backoff_factor=Base.REQUEST_BACKOFF,
+                min_interval=Base.REQUEST_INTERVAL,
+                pool_maxsize=Base.ODDS_MAX_WORKERS,
+            )
+        else:
+            pass
+
+    return _session
@@ -1,21 +1,190 @@
+from pathlib import Path
+from urllib.parse import quote
+
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
+from keiba.base import Base
+from keiba.utils.cache_utils import get_response_cache, page_ttl
+from keiba.utils.http_utils import get_session
+from keiba.utils.metrics_utils import metrics
 
-def get_jra_soup_object(base_url, page_param):
-    """Get soup object from jra base page by requests.
-    Parse it by BeautifulSoup.
+
+def select_parser(parser: str) -> str:
+    """Return parser name usable by BeautifulSoup.
+    lxml is optional, so fall back to html.parser if it's not installed.
     """
+    if parser == "lxml":
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            parser = "html.parser"
+    else:
+        pass
+
+    return parser
+
+
+HTML_PARSER = select_parser(Base.HTML_PARSER)
+
+
+def record_file_path(record_dir, page_param):
+    """File path to save response of page_param(cname) in record mode."""
+
+    return Path(record_dir) / f"{quote(page_param, safe='')}.html"
+
+
+def post_jra_page(base_url, page_param, refresh=False):
+    """Post cname(page_param) to jra base page by shared session,
+    and return raw content(shift-jis bytes).
+
+    Pages with TTL(Base.RESPONSE_CACHE_TTLS) are served from on-disk
+    response cache while fresh. Expired entry is revalidated by
+    conditional request(ETag/Last-Modified), if server sent them.
+    Odds pages are never cached.
+    In record mode(Base.RECORD_PATH), raw response is saved keyed by cname,
+    and cache is bypassed so every page is recorded.
+    Raises requests.HTTPError if response is not 200(or 304 of revalidation).
+
+    refresh: bool
+        Skip reading cache, and store fetched content.
+    """
+
+    cache = get_response_cache() if not Base.RECORD_PATH else None
+    ttl = page_ttl(page_param, Base.RESPONSE_CACHE_TTLS) if cache else 0
+
+    entry = cache.get(base_url, page_param) if ttl > 0 else None
+    if (entry is not None) and (not refresh) and (entry[2] < ttl):
+        cache.hit(base_url, page_param)
+        return entry[0]
+    else:
+        pass
+
+    headers = {}
+    if (entry is not None) and (not refresh):
+        meta = entry[1]
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    else:
+        pass
 
     payload = {"cname": page_param}
-    r = requests.post(url=base_url, data=payload)
-    r.encoding = "shift-jis"
+    with metrics.span("jra_network"):
+        r = get_session().post(url=base_url, data=payload, headers=headers or None)
+
+    if headers and (r.status_code == 304):
+        cache.revalidated(base_url, page_param)
+        content = entry[0]
+    elif r.status_code != 200:
+        raise requests.HTTPError(
+            f"{r.status_code} response for cname {page_param}", response=r
+        )
+    else:
+        content = r.content
+        if ttl > 0:
+            cache.miss()
+            meta = {
+                "etag": r.headers.get("ETag", ""),
+                "last_modified": r.headers.get("Last-Modified", ""),
+            }
+            cache.put(base_url, page_param, content, meta)
+        else:
+            pass
+
+    if Base.RECORD_PATH:
+        file_path = record_file_path(Base.RECORD_PATH, page_param)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(content)
+    else:
+        pass
+
+    return content
+
+
+def get_jra_html(base_url, page_param, refresh=False):
+    """Get html text from jra base page by shared session."""
+
+    content = post_jra_page(base_url, page_param, refresh=refresh)
+
+    with metrics.span("jra_decode"):
+        html = content.decode("shift-jis", errors="replace")
+
+    return html
 
-    soup = BeautifulSoup(r.text, "html.parser")
+
+def get_jra_content(base_url, page_param):
+    """Get raw content(shift-jis bytes) from jra base page by shared session.
+    Not decoded, so caller can decode only the part it needs.
+    """
+
+    return post_jra_page(base_url, page_param)
+
+
+def slice_table_html(content, table_id):
+    """Find <table id="table_id">...</table> region in raw content,
+    and decode that slice only.
+    ASCII '<' never appears as 2nd byte of shift-jis characters,
+    so searching markers in raw bytes is safe.
+
+    Returns
+    -------
+    str
+        decoded table html. None if table is not found.
+    """
+    id_pos = content.find(f'id="{table_id}"'.encode("ascii"))
+    if id_pos < 0:
+        return None
+    else:
+        pass
+
+    start_ = content.rfind(b"<table", 0, id_pos)
+    end_ = content.find(b"</table>", id_pos)
+    if (start_ < 0) or (end_ < 0):
+        return None
+    else:
+        pass
+
+    table_bytes = content[start_:end_ + len(b"</table>")]
+
+    return table_bytes.decode("shift-jis", errors="replace")
+
+
+def parse_jra_html(html, parser=HTML_PARSER, parse_only=None):
+    """Parse jra html by BeautifulSoup.
+    If parse_only(SoupStrainer) is given, build only matched part of tree.
+    """
+    with metrics.span("jra_parse"):
+        soup = BeautifulSoup(html, parser, parse_only=parse_only)
 
     return soup
 
 
+def get_jra_soup_object(base_url, page_param, parse_only=None, refresh=False):
+    """Get soup object from jra base page by shared session.
+    Parse it by BeautifulSoup.
+
+    parse_only: SoupStrainer
+        Restrict tree to the part the caller needs.
+        (ex. SoupStrainer(id="odds_list") for odds page)
+
+    refresh: bool
+        Don't use cached response.(see post_jra_page)
+    """
+
+    html = get_jra_html(base_url, page_param, refresh=refresh)
+    soup = parse_jra_html(html, parse_only=parse_only)
+
+    return soup
+
+
+def odds_list_strainer():
+    """SoupStrainer to build odds_list table only from odds page."""
+
+    return SoupStrainer(id="odds_list")
+
+
 def get_page_param(a_tag_text):
     """get page param from onclick argument in html <a>."""
     onclick_text = a_tag_text.get("onclick")
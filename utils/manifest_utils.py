@@ -0,0 +1,149 @@
+import json
+from bisect import bisect_right
+from pathlib import Path
+
+from keiba.utils.file_utils import read_json, read_json_cached
+
+MANIFEST_FILE = "manifest.json"
+
+# per kaisai json files used before manifest, key of each race field
+LEGACY_FILES = {
+    "race_card": "race_params.json",
+    "time": "times.json",
+    "odds": "odds_params.json",
+}
+
+
+class DayManifest:
+    """Compact manifest of 1 kaisai date.
+    Generated by Settings(file_setting.py), odds params are added by OddsSetting,
+    and result params by RaceResults.
+    Later stages load it once, instead of scanning dirs and reading json files
+    of each kaisai.
+
+    manifest.json(BASE_PATH/kaisai_date/manifest.json):
+        kaisai_date: jra_format date
+        kaisai: kaisai_name -> race_num -> race fields
+            time: start_time(yyyymmddhhmm)
+            race_card, odds, result: page parameter
+
+    Examples
+    --------
+        {
+            "kaisai_date": "1月5日（土曜）",
+            "kaisai": {
+                "1回中山1日": {
+                    "1": {
+                        "time": "202301051010",
+                        "race_card": "aa01bbl00000000000000000000/AA",
+                        "odds": "aa01bbl00000000000000000000/AB",
+                    },
+                    ...
+                },
+                ...
+            }
+        }
+    """
+
+    def __init__(self, kaisai_date: str, kaisai: dict = None) -> None:
+        self.kaisai_date = kaisai_date
+        self.kaisai = kaisai if kaisai is not None else {}
+
+        # (time, kaisai_name, race_num) sorted by time and its times, built when needed
+        self._by_time = None
+        self._times = []
+
+        return None
+
+    @property
+    def kaisai_names(self) -> list:
+        return list(self.kaisai.keys())
+
+    def params(self, kaisai_name: str, field: str) -> dict:
+        """{race_num: value} of field("time", "race_card", "odds", "result").
+        Races without field are left out.
+        """
+        return {
+            race_num: race[field]
+            for race_num, race in self.kaisai[kaisai_name].items()
+            if field in race
+        }
+
+    def times(self, kaisai_name: str) -> dict:
+        """{race_num: start_time}, same as times.json."""
+
+        return self.params(kaisai_name, "time")
+
+    def set_race(self, kaisai_name: str, race_num: str, **fields) -> None:
+        """Add or update fields of race."""
+        race = self.kaisai.setdefault(kaisai_name, {}).setdefault(race_num, {})
+        race.update(fields)
+
+        if "time" in fields:
+            self._by_time = None
+        else:
+            pass
+
+        return None
+
+    @property
+    def by_time(self) -> list:
+        """(time, kaisai_name, race_num) of all races, sorted by time."""
+        if self._by_time is None:
+            self._by_time = sorted(
+                (race["time"], kaisai_name, race_num)
+                for kaisai_name, races in self.kaisai.items()
+                for race_num, race in races.items()
+                if "time" in race
+            )
+            self._times = [race[0] for race in self._by_time]
+        else:
+            pass
+
+        return self._by_time
+
+    def races_after(self, time_: str) -> list:
+        """(time, kaisai_name, race_num) of races starting after time_(yyyymmddhhmm).
+        Found by bisect on by_time.
+        """
+        by_time = self.by_time
+        i = bisect_right(self._times, time_)
+
+        return by_time[i:]
+
+    def save(self, dir_path: Path) -> None:
+        """Write manifest.json into dir_path(BASE_PATH/kaisai_date)."""
+        dir_path.mkdir(parents=True, exist_ok=True)
+
+        dict_ = {"kaisai_date": self.kaisai_date, "kaisai": self.kaisai}
+        with (dir_path / MANIFEST_FILE).open(mode="w") as f:
+            json.dump(dict_, f, ensure_ascii=False, separators=(",", ":"))
+
+        return None
+
+    @classmethod
+    def load(cls, dir_path: Path) -> "DayManifest":
+        """Read manifest.json in dir_path(BASE_PATH/kaisai_date),
+        through process-wide json cache(file_utils.read_json_cached).
+        If it doesn't exist(dir created before manifest),
+        build it from json files of each kaisai dir.
+        """
+        file_path = dir_path / MANIFEST_FILE
+        if file_path.exists():
+            dict_ = read_json_cached(file_path)
+            return cls(dict_["kaisai_date"], dict_["kaisai"])
+        else:
+            pass
+
+        manifest = cls(dir_path.name)
+        for kaisai_path in sorted(p for p in dir_path.iterdir() if p.is_dir()):
+            for field, file_name in LEGACY_FILES.items():
+                if not (kaisai_path / file_name).exists():
+                    continue
+                else:
+                    pass
+
+                for race_num, value in read_json(kaisai_path / file_name).items():
+                    manifest.set_race(kaisai_path.name, race_num, **{field: value})
+
+        return manifest
@@ -0,0 +1,192 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+
+class Metrics:
+    """Thread safe registry of timing spans.
+    Each (name, labels) is aggregated into count, sum and max seconds.
+    """
+
+    def __init__(self) -> None:
+        # key: (name, ((label, value), ...)), value: [count, sum, max]
+        self._spans = {}
+        self._lock = threading.Lock()
+
+        return None
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key_ = (name, tuple(sorted(labels.items())))
+
+        with self._lock:
+            span_ = self._spans.setdefault(key_, [0, 0.0, 0.0])
+            span_[0] += 1
+            span_[1] += seconds
+            span_[2] = max(span_[2], seconds)
+
+        return None
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """Measure seconds of with block.
+
+        Examples
+        --------
+            with metrics.span("odds_fetch", kaisai="1回中山1日", race="11"):
+                content = get_jra_content(...)
+        """
+        start_ = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start_, **labels)
+
+    def snapshot(self) -> list:
+        """All spans, list of {name, labels, count, sum, max}."""
+        with self._lock:
+            items = [(key_, list(span_)) for key_, span_ in self._spans.items()]
+
+        return [
+            {
+                "name": name,
+                "labels": dict(labels),
+                "count": count,
+                "sum": round(sum_, 6),
+                "max": round(max_, 6),
+            }
+            for (name, labels), (count, sum_, max_) in items
+        ]
+
+    def to_prometheus(self) -> str:
+        """Prometheus text format.
+        ex) keiba_odds_fetch_seconds_count{kaisai="1回中山1日",race="11"} 52
+        """
+        lines = []
+        for span_ in sorted(self.snapshot(), key=lambda x: x["name"]):
+            metric = f"keiba_{span_['name']}_seconds"
+            labels = ",".join(f'{k}="{v}"' for k, v in span_["labels"].items())
+            labels = f"{{{labels}}}" if labels else ""
+
+            lines.append(f"{metric}_count{labels} {span_['count']}")
+            lines.append(f"{metric}_sum{labels} {span_['sum']}")
+            lines.append(f"{metric}_max{labels} {span_['max']}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, file_path: Path) -> None:
+        """Write snapshot into json file. (replaced atomically)"""
+        tmp_path = file_path.with_suffix(".tmp")
+        with tmp_path.open(mode="w") as f:
+            json.dump(
+                {"time": time.time(), "spans": self.snapshot()}, f, ensure_ascii=False
+            )
+        tmp_path.replace(file_path)
+
+        return None
+
+
+# process-wide metrics of collector hot path
+metrics = Metrics()
+
+
+class MetricsExporter:
+    """Export metrics by Prometheus style text endpoint(GET /metrics),
+    and/or json file written periodically. Runs in daemon threads.
+
+    Parameters
+    ----------
+    metrics: Metrics
+
+    port: int
+        Port of text endpoint, bound to 127.0.0.1. 0 not to start.
+
+    json_path: str
+        Json file path. '' not to write.
+
+    json_interval: float
+        Seconds between json writes.
+    """
+
+    def __init__(
+        self, metrics: Metrics, port: int, json_path: str, json_interval: float
+    ) -> None:
+        self.metrics = metrics
+        self.port = port
+        self.json_path = Path(json_path) if json_path else None
+        self.json_interval = json_interval
+
+        self.server = None
+        self._stop = threading.Event()
+
+        return None
+
+    def start(self) -> None:
+        if self.port:
+            self.server = ThreadingHTTPServer(
+                ("127.0.0.1", self.port), self._make_handler()
+            )
+            threading.Thread(
+                target=self.server.serve_forever, name="metrics", daemon=True
+            ).start()
+        else:
+            pass
+
+        if self.json_path is not None:
+            threading.Thread(
+                target=self._write_json_loop, name="metrics-json", daemon=True
+            ).start()
+        else:
+            pass
+
+        return None
+
+    def stop(self) -> None:
+        self._stop.set()
+
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        else:
+            pass
+
+        if self.json_path is not None:
+            self.metrics.write_json(self.json_path)
+        else:
+            pass
+
+        return None
+
+    def _write_json_loop(self) -> None:
+        while not self._stop.wait(self.json_interval):
+            self.metrics.write_json(self.json_path)
+
+        return None
+
+    def _make_handler(self):
+        metrics_ = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return None
+                else:
+                    pass
+
+                data = metrics_.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+                return None
+
+            def log_message(self, format, *args) -> None:
+                return None
+
+        return Handler
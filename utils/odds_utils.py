@@ -0,0 +1,384 @@
+import csv
+import math
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from itertools import groupby
+from pathlib import Path
+
+
+def diff_odds(last_odds: dict, odds_list: list) -> list:
+    """Compare odds_list with last snapshot, and return changed rows only.
+    If no row changed, return 1 unchanged marker row(empty name and odds)
+    to keep the time of snapshot.
+
+    Parameters
+    ----------
+    last_odds: dict
+        key: horse name
+        value: odds value
+        (last snapshot, updated by this function)
+
+    odds_list: list
+        contains odds_dict(name, odds, time)
+
+    Returns
+    -------
+    list
+        rows to write into stored file.
+    """
+    changed_list = [
+        odds_dict
+        for odds_dict in odds_list
+        if last_odds.get(odds_dict["name"]) != odds_dict["odds"]
+    ]
+
+    for odds_dict in changed_list:
+        last_odds[odds_dict["name"]] = odds_dict["odds"]
+
+    if (not changed_list) and odds_list:
+        changed_list = [{"name": "", "odds": "", "time": odds_list[0]["time"]}]
+    else:
+        pass
+
+    return changed_list
+
+
+def read_odds_series(file_path: Path) -> list:
+    """Read stored file(race_{num}.csv) written by diff_odds,
+    and reconstruct full odds time series.
+    Each snapshot contains every horse known until then.
+
+    Returns
+    -------
+    list
+        contains odds_dict(name, odds, time)
+        time is string read from csv.
+    """
+    odds_series = []
+    current_odds = {}
+
+    with file_path.open(mode="r", newline="") as f:
+        reader_ = csv.DictReader(f)
+
+        for time_, rows in groupby(reader_, key=lambda row: row["time"]):
+            for row in rows:
+                if row["name"]:
+                    current_odds[row["name"]] = row["odds"]
+                else:
+                    pass
+
+            odds_series.extend(
+                {"name": name, "odds": odds, "time": time_}
+                for name, odds in current_odds.items()
+            )
+
+    return odds_series
+
+
+def _to_float(odds: str) -> float:
+    try:
+        return float(odds)
+    except ValueError:
+        return math.nan
+
+
+# horse numbers of combination odds are 1 ~ MAX_HORSES
+MAX_HORSES = 18
+
+
+class ComboOdds:
+    """Dense odds array of 1 bet type in 1 snapshot,
+    indexed by horse number tuple.
+
+    Every combination has a fixed position, so snapshots are compared
+    and stored cell by cell without keys.
+    Combination not on sale(or not number, ex. '取消') is NaN.
+
+    Parameters
+    ----------
+    horses: int
+        Number of horses in 1 combination.(1: place, 2: quinella/exacta, 3: trifecta)
+
+    ordered: bool
+        If False, (2, 1) is the same combination as (1, 2).
+
+    width: int
+        Values per combination.(2 for odds range, ex. place: low, high)
+
+    values: array
+        float32 array to use. If None, all NaN.
+    """
+
+    def __init__(
+        self, horses: int, ordered: bool, width: int = 1, values: array = None
+    ) -> None:
+        self.horses = horses
+        self.ordered = ordered
+        self.width = width
+        self.size = MAX_HORSES ** horses * width
+
+        if values is None:
+            values = array("f", [math.nan]) * self.size
+        else:
+            pass
+
+        self.values = values
+
+        return None
+
+    def index(self, combo: tuple) -> int:
+        """Position of combo's first value in self.values."""
+        if not self.ordered:
+            combo = sorted(combo)
+        else:
+            pass
+
+        i = 0
+        for horse_num in combo:
+            i = i * MAX_HORSES + (horse_num - 1)
+
+        return i * self.width
+
+    def combo(self, index: int) -> tuple:
+        """Horse number tuple of position index."""
+        i = index // self.width
+        combo = []
+        for _ in range(self.horses):
+            i, horse_num = divmod(i, MAX_HORSES)
+            combo.append(horse_num + 1)
+
+        return tuple(reversed(combo))
+
+    def set(self, combo: tuple, *odds) -> None:
+        """Set odds value(s) of combo. Strings are converted to float."""
+        i = self.index(combo)
+        for j, value in enumerate(odds[:self.width]):
+            self.values[i + j] = _to_float(value) if isinstance(value, str) else value
+
+        return None
+
+    def get(self, combo: tuple):
+        """Odds of combo, float(width 1) or tuple of floats."""
+        i = self.index(combo)
+        if self.width == 1:
+            return self.values[i]
+        else:
+            return tuple(self.values[i:i + self.width])
+
+    def items(self) -> list:
+        """(combo, odds) of combinations on sale."""
+        return [
+            (self.combo(i), self.get(self.combo(i)))
+            for i in range(0, self.size, self.width)
+            if not all(math.isnan(v) for v in self.values[i:i + self.width])
+        ]
+
+
+class RaceOddsStore:
+    """Compact in-memory odds time series of 1 race.
+
+    Horse names are interned once per race(column index),
+    odds are stored in 1 flat float32 array(ticks x horses, row major),
+    and timestamps in int64 array(unix time, milliseconds).
+    Odds which are not number(ex. '取消') and horses missing in a snapshot are NaN.
+
+    Appending(collector) and querying(live api) can run in different threads.
+    """
+
+    def __init__(self) -> None:
+        self.names = []
+        # key: horse name, value: column index
+        self.columns = {}
+        self.times = array("q")
+        self.odds = array("f")
+        self._lock = threading.RLock()
+
+        return None
+
+    def append(self, odds_list: list) -> None:
+        """Append 1 snapshot(odds_list, contains odds_dict(name, odds, time))."""
+        if not odds_list:
+            return None
+        else:
+            pass
+
+        with self._lock:
+            new_names = [
+                odds_dict["name"]
+                for odds_dict in odds_list
+                if odds_dict["name"] not in self.columns
+            ]
+            if new_names:
+                self._add_columns(new_names)
+            else:
+                pass
+
+            row = array("f", [math.nan]) * len(self.names)
+            for odds_dict in odds_list:
+                row[self.columns[odds_dict["name"]]] = _to_float(odds_dict["odds"])
+
+            self.odds.extend(row)
+            self.times.append(int(odds_list[0]["time"].timestamp() * 1000))
+
+        return None
+
+    def _add_columns(self, new_names: list) -> None:
+        """Add horses appeared after first snapshot. Past ticks are NaN."""
+        old_width = len(self.names)
+
+        for name in new_names:
+            self.columns[name] = len(self.names)
+            self.names.append(sys.intern(name))
+
+        if self.times:
+            padding = array("f", [math.nan]) * len(new_names)
+            odds = array("f")
+            for i in range(len(self.times)):
+                odds.extend(self.odds[i * old_width:(i + 1) * old_width])
+                odds.extend(padding)
+            self.odds = odds
+        else:
+            pass
+
+        return None
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def row(self, i: int) -> array:
+        """Odds of all horses at tick i. (column order is self.names)"""
+        with self._lock:
+            width = len(self.names)
+            i = i if i >= 0 else len(self.times) + i
+
+            return self.odds[i * width:(i + 1) * width]
+
+    def matrix(self) -> tuple:
+        """Odds matrix of the race.
+
+        Returns
+        -------
+        tuple
+            times: array(int64, ticks)
+            names: list(horses)
+            rows: list of array(float32, horses), ticks x horses
+        """
+        with self._lock:
+            rows = [self.row(i) for i in range(len(self.times))]
+
+            return (array("q", self.times), list(self.names), rows)
+
+    def series(self, name: str) -> list:
+        """Time series of 1 horse, list of (time, odds)."""
+        with self._lock:
+            width = len(self.names)
+            column = self.columns[name]
+
+            return [
+                (time_, self.odds[i * width + column])
+                for i, time_ in enumerate(self.times)
+            ]
+
+    def latest(self) -> dict:
+        """Latest snapshot.
+
+        Returns
+        -------
+        dict
+            key: "time"
+            value: unix time(milliseconds), None if empty
+
+            key: "odds"
+            value: dict, key: horse name, value: odds
+        """
+        with self._lock:
+            if not self.times:
+                return {"time": None, "odds": {}}
+            else:
+                pass
+
+            return {
+                "time": self.times[-1],
+                "odds": dict(zip(self.names, self.row(-1))),
+            }
+
+    def delta(self, minutes: float) -> dict:
+        """Change of each horse's odds over the last minutes.
+        Compared with the latest snapshot at or before (latest time - minutes).
+        If there is no such snapshot, compared with the first one.
+
+        Returns
+        -------
+        dict
+            key: "time", "base_time"
+            value: unix time(milliseconds) of latest and compared snapshot
+
+            key: "odds"
+            value: dict, key: horse name, value: (base odds, latest odds, change)
+        """
+        with self._lock:
+            if not self.times:
+                return {"time": None, "base_time": None, "odds": {}}
+            else:
+                pass
+
+            base_limit = self.times[-1] - int(minutes * 60 * 1000)
+            base_i = bisect_right(self.times, base_limit) - 1
+            base_i = max(base_i, 0)
+
+            latest_row = self.row(-1)
+            base_row = self.row(base_i)
+
+            return {
+                "time": self.times[-1],
+                "base_time": self.times[base_i],
+                "odds": {
+                    name: (base, latest, latest - base)
+                    for name, base, latest in zip(self.names, base_row, latest_row)
+                },
+            }
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate bytes of stored data."""
+        names_bytes = sum(sys.getsizeof(name) for name in self.names)
+        arrays_bytes = sys.getsizeof(self.times) + sys.getsizeof(self.odds)
+
+        return names_bytes + arrays_bytes
+
+
+class DayOddsStore:
+    """RaceOddsStore of all races in a race day.
+    key: (kaisai_name, race_num)
+    """
+
+    def __init__(self) -> None:
+        self.races = {}
+        self._lock = threading.Lock()
+
+        return None
+
+    def race(self, kaisai_name: str, race_num: str) -> RaceOddsStore:
+        with self._lock:
+            return self.races.setdefault((kaisai_name, race_num), RaceOddsStore())
+
+    def get(self, kaisai_name: str, race_num: str) -> RaceOddsStore:
+        """RaceOddsStore of race, None if not stored."""
+        with self._lock:
+            return self.races.get((kaisai_name, race_num))
+
+    def keys(self) -> list:
+        """Stored races, list of (kaisai_name, race_num)."""
+        with self._lock:
+            return list(self.races.keys())
+
+    def append(self, kaisai_name: str, race_num: str, odds_list: list) -> None:
+        self.race(kaisai_name, race_num).append(odds_list)
+
+        return None
+
+    @property
+    def nbytes(self) -> int:
+        return sum(store.nbytes for store in self.races.values())
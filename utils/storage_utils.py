@@ -0,0 +1,527 @@
+import atexit
+import csv
+import math
+import os
+import struct
+import sys
+import threading
+import time
+import weakref
+from array import array
+from datetime import datetime
+from pathlib import Path
+
+from keiba.utils.odds_utils import _to_float, diff_odds
+
+# ComboOddsWriter record header, time(int64 ms) and changed cell count(uint32)
+COMBO_RECORD_HEADER = struct.Struct("<qI")
+
+# writers flushed at exit, so buffered snapshots are not lost on shutdown
+_open_writers = weakref.WeakSet()
+
+
+@atexit.register
+def _close_open_writers() -> None:
+    for writer in list(_open_writers):
+        writer.close()
+
+    return None
+
+
+class CsvOddsWriter:
+    """Write odds snapshots into race_{num}.csv.
+    Rows changed from last snapshot only are appended.
+    (full time series is reconstructed by odds_utils.read_odds_series)
+
+    File handle is kept open through race day, rows are written as tuples,
+    and flushed every flush_rows rows or flush_interval seconds.
+    flush_interval is kept by timer even if no more rows come
+    (ex. after race's last tick), and buffered rows are also flushed at exit(atexit).
+
+    If file already exists(restart), last snapshot and its time are read from it,
+    so appends are idempotent: rows changed during downtime are written correctly,
+    and snapshots not newer than the last written one are not written again.
+    Truncated last row(crash while writing) is dropped.
+
+    Parameters
+    ----------
+    dir_path: Path
+        kaisai dir to store file.
+
+    race_num: str
+        Target race number.
+
+    flush_rows: int
+        Flush when this number of rows are buffered.
+
+    flush_interval: float
+        Flush when this seconds passed since last flush.
+
+    fsync: bool
+        If True, os.fsync on each flush so rows survive os crash.
+
+    write_count, flushed_count: int
+        Number of snapshots written, and of them flushed.
+        (snapshots up to flushed_count are not lost on hard kill)
+    """
+
+    def __init__(
+        self,
+        dir_path: Path,
+        race_num: str,
+        flush_rows: int = 1,
+        flush_interval: float = 0.0,
+        fsync: bool = False,
+    ) -> None:
+        self.file_path = dir_path / f"race_{race_num}.csv"
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+
+        # last snapshot, key: horse name, value: odds value
+        self.last_odds = {}
+        self.last_time = None
+        if self.file_path.exists():
+            self._restore()
+        else:
+            pass
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._writer = None
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+        self.write_count = 0
+        self.flushed_count = 0
+        # flushes buffered rows when flush_interval passed without next write
+        self._timer = None
+
+        _open_writers.add(self)
+
+        return None
+
+    def _restore(self) -> None:
+        """Read last snapshot and its time from existing file."""
+        data = self.file_path.read_bytes()
+        if data and not data.endswith(b"\n"):
+            with self.file_path.open(mode="r+b") as f:
+                f.truncate(data.rfind(b"\n") + 1)
+        else:
+            pass
+
+        with self.file_path.open(mode="r", newline="") as f:
+            for row in csv.DictReader(f):
+                if row["name"]:
+                    self.last_odds[row["name"]] = row["odds"]
+                else:
+                    pass
+
+                self.last_time = datetime.fromisoformat(row["time"])
+
+        return None
+
+    def write(self, odds_list: list) -> None:
+        if odds_list and (self.last_time is not None):
+            if odds_list[0]["time"] <= self.last_time:
+                # already written(ex. snapshot replayed after restart)
+                return None
+            else:
+                pass
+        else:
+            pass
+
+        if odds_list:
+            self.last_time = odds_list[0]["time"]
+        else:
+            pass
+
+        changed_list = diff_odds(self.last_odds, odds_list)
+
+        with self._lock:
+            if self._file is None:
+                self._file = self.file_path.open(mode="a", newline="")
+                self._writer = csv.writer(self._file)
+            else:
+                pass
+
+            self._writer.writerows(
+                (row["name"], row["odds"], row["time"]) for row in changed_list
+            )
+            self._pending_rows += len(changed_list)
+            self.write_count += 1
+
+            elapsed = time.monotonic() - self._last_flush
+            if (self._pending_rows >= self.flush_rows) or (
+                elapsed >= self.flush_interval
+            ):
+                self._flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(
+                    self.flush_interval - elapsed, self.flush
+                )
+                self._timer.daemon = True
+                self._timer.start()
+            else:
+                pass
+
+        return None
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+        return None
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            else:
+                pass
+
+        return None
+
+    def _flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            else:
+                pass
+        else:
+            pass
+
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        else:
+            pass
+
+        self._pending_rows = 0
+        self._last_flush = time.monotonic()
+        self.flushed_count = self.write_count
+
+        return None
+
+
+class ParquetOddsWriter:
+    """Buffer odds snapshots, and flush them as typed columnar(parquet) files.
+    Needs pyarrow.
+
+    Each flush creates race_{num}_{seq}.parquet in kaisai dir.
+
+    columns:
+        name: dictionary encoded string
+        odds: float32 (NaN if not number, ex. '取消')
+        time: int64 (unix time, milliseconds)
+
+    Parameters
+    ----------
+    dir_path: Path
+        kaisai dir to store files.
+
+    race_num: str
+        Target race number.
+
+    flush_snapshots: int
+        Flush buffer every this number of snapshots.
+
+    write_count, flushed_count: int
+        Same as CsvOddsWriter.
+    """
+
+    def __init__(self, dir_path: Path, race_num: str, flush_snapshots: int) -> None:
+        import pyarrow  # noqa: F401
+
+        self.dir_path = dir_path
+        self.race_num = race_num
+        self.flush_snapshots = flush_snapshots
+
+        self.seq = len(list(dir_path.glob(f"race_{race_num}_*.parquet")))
+        self.snapshot_count = 0
+        self.names = []
+        self.odds = []
+        self.times = []
+        self.write_count = 0
+        self.flushed_count = 0
+
+        _open_writers.add(self)
+
+        return None
+
+    def write(self, odds_list: list) -> None:
+        for odds_dict in odds_list:
+            self.names.append(odds_dict["name"])
+            self.odds.append(_to_float(odds_dict["odds"]))
+            self.times.append(int(odds_dict["time"].timestamp() * 1000))
+
+        self.snapshot_count += 1
+        self.write_count += 1
+        if self.snapshot_count >= self.flush_snapshots:
+            self.flush()
+        else:
+            pass
+
+        return None
+
+    def flush(self) -> None:
+        """Write buffered snapshots into new parquet file."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self.names:
+            self.flushed_count = self.write_count
+            return None
+        else:
+            pass
+
+        table = pa.table(
+            {
+                "name": pa.array(self.names, pa.string()).dictionary_encode(),
+                "odds": pa.array(self.odds, pa.float32()),
+                "time": pa.array(self.times, pa.int64()),
+            }
+        )
+        file_path = self.dir_path / f"race_{self.race_num}_{self.seq:04d}.parquet"
+        pq.write_table(table, file_path)
+
+        self.seq += 1
+        self.flushed_count = self.write_count
+        self.snapshot_count = 0
+        self.names = []
+        self.odds = []
+        self.times = []
+
+        return None
+
+    def close(self) -> None:
+        self.flush()
+
+        return None
+
+
+class ComboOddsWriter:
+    """Write dense odds snapshots(ComboOdds.values) of 1 bet type
+    into race_{num}_{bet_type}.bin.
+    Only cells changed from last snapshot are appended,
+    so file doesn't grow with unchanged odds.
+    (full time series is reconstructed by read_combo_odds)
+
+    record(little endian):
+        time: int64 (unix time, milliseconds)
+        count: uint32 (number of changed cells)
+        index: uint16 x count (position in ComboOdds.values)
+        value: float32 x count
+
+    If file already exists(restart), last snapshot is read from it,
+    so changes during downtime are appended correctly.
+    Truncated last record(crash while writing) is dropped.
+
+    Parameters
+    ----------
+    dir_path: Path
+        kaisai dir to store file.
+
+    race_num: str
+        Target race number.
+
+    bet_type: str
+        Bet type name.(ex. 'trifecta')
+
+    size: int
+        Length of ComboOdds.values.
+
+    fsync: bool
+        If True, os.fsync on each write so records survive os crash.
+    """
+
+    def __init__(
+        self,
+        dir_path: Path,
+        race_num: str,
+        bet_type: str,
+        size: int,
+        fsync: bool = False,
+    ) -> None:
+        self.file_path = dir_path / f"race_{race_num}_{bet_type}.bin"
+        self.size = size
+        self.fsync = fsync
+
+        self.last_values = None
+        if self.file_path.exists():
+            data = self.file_path.read_bytes()
+            series, end_ = _parse_combo_records(data, size)
+            if end_ < len(data):
+                # drop truncated last record, so new records can be read
+                with self.file_path.open(mode="r+b") as f:
+                    f.truncate(end_)
+            else:
+                pass
+
+            self.last_values = series[-1][1] if series else None
+        else:
+            pass
+
+        if self.last_values is None:
+            self.last_values = array("f", [math.nan]) * size
+        else:
+            pass
+
+        self._lock = threading.Lock()
+        self._file = None
+
+        _open_writers.add(self)
+
+        return None
+
+    def write(self, values: array, time_: datetime) -> None:
+        """Append cells of values changed from last snapshot.
+        NaN to NaN is not a change.
+        """
+        index = array("H")
+        changed = array("f")
+        for i, (last, value) in enumerate(zip(self.last_values, values)):
+            if (last != value) and not (last != last and value != value):
+                index.append(i)
+                changed.append(value)
+            else:
+                pass
+
+        self.last_values = array("f", values)
+
+        header = COMBO_RECORD_HEADER.pack(int(time_.timestamp() * 1000), len(index))
+        if sys.byteorder != "little":
+            index.byteswap()
+            changed.byteswap()
+        else:
+            pass
+
+        with self._lock:
+            if self._file is None:
+                self._file = self.file_path.open(mode="ab")
+            else:
+                pass
+
+            self._file.write(header + index.tobytes() + changed.tobytes())
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            else:
+                pass
+
+        return None
+
+    def flush(self) -> None:
+        # records are flushed on each write
+        return None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            else:
+                pass
+
+        return None
+
+
+def read_combo_odds(file_path: Path, size: int) -> list:
+    """Read race_{num}_{bet_type}.bin written by ComboOddsWriter,
+    and reconstruct full snapshots.
+    Truncated last record(crash while writing) is ignored.
+
+    Returns
+    -------
+    list
+        contains (time, values)
+        time: unix time(milliseconds)
+        values: float32 array of size, same layout as ComboOdds.values
+    """
+    series, _ = _parse_combo_records(file_path.read_bytes(), size)
+
+    return series
+
+
+def _parse_combo_records(data: bytes, size: int) -> tuple:
+    """Parse records of ComboOddsWriter.
+    Returns (series, end position of last complete record).
+    """
+    current = array("f", [math.nan]) * size
+
+    series = []
+    pos = 0
+    while pos + COMBO_RECORD_HEADER.size <= len(data):
+        time_, count = COMBO_RECORD_HEADER.unpack_from(data, pos)
+        start_ = pos + COMBO_RECORD_HEADER.size
+
+        end_ = start_ + count * 6
+        if end_ > len(data):
+            break
+        else:
+            pass
+
+        index = array("H", data[start_:start_ + count * 2])
+        changed = array("f", data[start_ + count * 2:end_])
+        if sys.byteorder != "little":
+            index.byteswap()
+            changed.byteswap()
+        else:
+            pass
+
+        for i, value in zip(index, changed):
+            current[i] = value
+
+        series.append((time_, array("f", current)))
+        pos = end_
+
+    return (series, pos)
+
+
+def make_odds_writer(
+    storage: str,
+    dir_path: Path,
+    race_num: str,
+    flush_snapshots: int,
+    flush_rows: int,
+    flush_interval: float,
+    fsync: bool,
+):
+    """Return odds writer selected by storage name('csv' or 'parquet').
+    flush_snapshots is for parquet, flush_rows, flush_interval and fsync are for csv.
+    """
+    if storage == "csv":
+        return CsvOddsWriter(dir_path, race_num, flush_rows, flush_interval, fsync)
+    elif storage == "parquet":
+        return ParquetOddsWriter(dir_path, race_num, flush_snapshots)
+    else:
+        raise ValueError(f"unknown odds storage: {storage}")
+
+
+def read_parquet_day(day_path: Path):
+    """Load all parquet odds files of 1 kaisai_date into a single table.
+    kaisai name and race number are added as dictionary encoded columns.
+
+    Returns
+    -------
+    pyarrow.Table
+        columns: kaisai, race, name, odds, time
+        (use .to_pandas() for DataFrame)
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    tables = []
+    for file_path in sorted(day_path.glob("*/race_*_*.parquet")):
+        race_num = file_path.stem.split("_")[1]
+
+        table = pq.read_table(file_path)
+        kaisai = pa.array([file_path.parent.name] * len(table)).dictionary_encode()
+        race = pa.array([race_num] * len(table)).dictionary_encode()
+
+        table = table.add_column(0, "race", race).add_column(0, "kaisai", kaisai)
+        tables.append(table)
+
+    return pa.concat_tables(tables)